@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+# SPDX-License-Identifier: GPL-2.0-or-later
+# Copyright (C) 2020-present Team CoreELEC (https://coreelec.org)
+
+# Command line client of the control socket, runs without Kodi.
+# All settings of one get or set go to the service in a single request.
+
+import json
+import socket
+import sys
+
+SOCKET = '/var/run/service.coreelec.settings.sock'
+
+USAGE = '''usage:
+  cli.py get module/setting ...
+  cli.py set module/setting=value ...
+  cli.py list [module]
+  cli.py call method [json params]
+  cli.py command [arguments]      help, wakeups, profile start, ...'''
+
+
+class Client(object):
+
+    def __init__(self, path=SOCKET):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(path)
+        self.reader = self.sock.makefile('rb')
+        self.id = 0
+
+    def close(self):
+        self.reader.close()
+        self.sock.close()
+
+    def request(self, line):
+        self.sock.sendall(line.encode('utf-8') + b'\n')
+        response = self.reader.readline()
+        if not response:
+            raise ConnectionError('service closed the connection')
+        return json.loads(response)
+
+    def command(self, command, *arguments):
+        response = self.request(' '.join((command,) + arguments))
+        if 'error' in response:
+            raise RuntimeError(response['error'])
+        return response['result']
+
+    def call(self, method, params=None):
+        self.id += 1
+        request = {'jsonrpc': '2.0', 'id': self.id, 'method': method}
+        if params is not None:
+            request['params'] = params
+        response = self.request(json.dumps(request))
+        if 'error' in response:
+            raise RuntimeError(f'{response["error"]["message"]} ({response["error"]["code"]})')
+        return response['result']
+
+
+def _split(names):
+    # module/setting ... -> {module: [setting, ...]}
+    modules = {}
+    for name in names:
+        module, _, setting = name.partition('/')
+        if not module or not setting:
+            raise ValueError(f'{name!r} is not module/setting')
+        modules.setdefault(module, []).append(setting)
+    return modules
+
+
+def get_settings(client, names):
+    modules = _split(names)
+    batch = [{'jsonrpc': '2.0', 'id': module, 'method': 'settings.get', 'params': [module, settings]}
+             for module, settings in modules.items()]
+    responses = client.request(json.dumps(batch))
+    if isinstance(responses, dict):
+        raise RuntimeError(responses['error']['message'])
+    values = {}
+    for response in responses:
+        if 'error' in response:
+            raise RuntimeError(f'{response["id"]}: {response["error"]["message"]}')
+        values[response['id']] = response['result']
+    for name in names:
+        module, _, setting = name.partition('/')
+        value = values[module].get(setting)
+        print(f'{name}={"" if value is None else value}')
+
+
+def set_settings(client, assignments):
+    values = {}
+    for assignment in assignments:
+        name, equals, value = assignment.partition('=')
+        if not equals:
+            raise ValueError(f'{assignment!r} is not module/setting=value')
+        for module, settings in _split([name]).items():
+            values.setdefault(module, {})[settings[0]] = value
+    print(client.call('settings.set', [values]))
+
+
+def list_settings(client, module=None):
+    for name, settings in sorted(client.call('settings.list', [module]).items()):
+        for setting, value in sorted(settings.items()):
+            print(f'{name}/{setting}={value}')
+
+
+def _usage_error(argv):
+    # what is missing before anything is sent to the service
+    action, arguments = argv[0], argv[1:]
+    if action in ('get', 'set', 'call') and not arguments:
+        return f'{action} needs at least one argument'
+    if action == 'list' and len(arguments) > 1:
+        return 'list takes at most one module'
+    if action == 'call' and len(arguments) > 2:
+        return 'call takes a method and one json params argument'
+    return None
+
+
+def main(argv):
+    if not argv or argv[0] in ('-h', '--help'):
+        print(USAGE)
+        return 0
+    error = _usage_error(argv)
+    if error is not None:
+        print(f'error: {error}\n{USAGE}', file=sys.stderr)
+        return 1
+    client = Client()
+    try:
+        action, arguments = argv[0], argv[1:]
+        if action == 'get':
+            get_settings(client, arguments)
+        elif action == 'set':
+            set_settings(client, arguments)
+        elif action == 'list':
+            list_settings(client, *arguments[:1])
+        elif action == 'call':
+            params = json.loads(arguments[1]) if len(arguments) > 1 else None
+            print(json.dumps(client.call(arguments[0], params), indent=2, default=str))
+        else:
+            result = client.command(action, *arguments)
+            print(result if isinstance(result, str) else json.dumps(result, indent=2, default=str))
+    except (RuntimeError, ValueError) as e:
+        print(f'error: {e}', file=sys.stderr)
+        return 1
+    finally:
+        client.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
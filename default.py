@@ -6,6 +6,7 @@
 
 import xbmc
 import socket
+import sys
 import xbmcaddon
 
 __scriptid__ = 'service.coreelec.settings'
@@ -17,7 +18,8 @@ _ = __addon__.getLocalizedString
 try:
     sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
     sock.connect('/var/run/service.coreelec.settings.sock')
-    sock.send(bytes('openConfigurationWindow', 'utf-8'))
+    # RunScript(service.coreelec.settings,dumpDebugLog) dumps the debug ring
+    sock.send(bytes(f"{sys.argv[1] if len(sys.argv) > 1 and sys.argv[1].strip() else 'openConfigurationWindow'}\n", 'utf-8'))
     sock.close()
 except Exception as e:
     xbmc.executebuiltin(f'Notification("CoreELEC", "{_(32390)}", 5000, "{__media__}/icon.png"')
@@ -0,0 +1,144 @@
+# SPDX-License-Identifier: GPL-2.0-or-later
+# Copyright (C) 2020-present Team CoreELEC (https://coreelec.org)
+
+import mmap
+import os
+import re
+import struct
+import sys
+import zlib
+
+# compiled catalog: magic, size and CRC-32 of the .po it was compiled from,
+# string count, the sorted ids, count + 1 offsets into the UTF-8 blob that
+# follows them, little endian. The .po is identified by its content, not
+# its mtime, which a plain cp resets.
+MAGIC = b'CECAT\x00\x00\x02'
+_header = struct.Struct('<8sQII')
+_uint32 = struct.Struct('<I')
+
+_escape = re.compile(r'\\(.)')
+_escapes = {'n': '\n', 't': '\t', 'r': '\r'}
+
+
+def _unquote(text):
+    text = text.strip()
+    if len(text) > 1 and text[0] == text[-1] == '"':
+        text = text[1:-1]
+    return _escape.sub(lambda match: _escapes.get(match.group(1), match.group(1)), text)
+
+
+def _add(strings, entry):
+    context = entry.get('msgctxt', '')
+    translation = entry.get('msgstr', '')
+    # untranslated strings are left to Kodi so it can fall back to en_gb
+    if context.startswith('#') and context[1:].isdigit() and translation:
+        strings[int(context[1:])] = translation
+
+
+def read_po(path):
+    strings = {}
+    entry = {}
+    keyword = None
+    with open(path, encoding='utf-8') as po:
+        for line in po:
+            line = line.strip()
+            if line == '' or line.startswith('#'):
+                continue
+            if line.startswith('"'):
+                if keyword is not None:
+                    entry[keyword] += _unquote(line)
+                continue
+            keyword, _, value = line.partition(' ')
+            if keyword == 'msgctxt' or (keyword == 'msgid' and 'msgid' in entry):
+                _add(strings, entry)
+                entry = {}
+            entry[keyword] = _unquote(value)
+    _add(strings, entry)
+    return strings
+
+
+def po_path(addon_path, language):
+    return os.path.join(addon_path, 'resources', 'language', language, 'strings.po')
+
+
+def compiled_path(path):
+    return f'{os.path.splitext(path)[0]}.bin'
+
+
+def po_checksum(path):
+    with open(path, 'rb') as po:
+        data = po.read()
+    return len(data), zlib.crc32(data)
+
+
+def compile_po(path, output=None):
+    strings = read_po(path)
+    ids = sorted(strings)
+    blob = bytearray()
+    offsets = [0]
+    for code in ids:
+        blob += strings[code].encode('utf-8')
+        offsets.append(len(blob))
+    with open(output or compiled_path(path), 'wb') as table:
+        table.write(_header.pack(MAGIC, *po_checksum(path), len(ids)))
+        table.write(struct.pack(f'<{len(ids)}I', *ids))
+        table.write(struct.pack(f'<{len(offsets)}I', *offsets))
+        table.write(blob)
+
+
+class CompiledCatalog(object):
+
+    # looks strings up in the memory mapped table without loading it
+
+    def __init__(self, path, source=None):
+        # source: (size, crc) of the .po the table must have been compiled from
+        with open(path, 'rb') as table:
+            self.map = mmap.mmap(table.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, size, crc, self.count = _header.unpack_from(self.map)
+            if magic != MAGIC:
+                raise ValueError(f'{path} is not a compiled catalog')
+            if source is not None and source != (size, crc):
+                raise ValueError(f'{path} is out of date')
+            self.ids = _header.size
+            self.offsets = self.ids + 4 * self.count
+            self.blob = self.offsets + 4 * (self.count + 1)
+            if len(self.map) < self.blob + self.offset(self.count):
+                raise ValueError(f'{path} is truncated')
+        except Exception:
+            self.map.close()
+            raise
+
+    def offset(self, index):
+        return _uint32.unpack_from(self.map, self.offsets + 4 * index)[0]
+
+    def get(self, code, default=None):
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if _uint32.unpack_from(self.map, self.ids + 4 * middle)[0] < code:
+                low = middle + 1
+            else:
+                high = middle
+        if low == self.count or _uint32.unpack_from(self.map, self.ids + 4 * low)[0] != code:
+            return default
+        start = self.blob + self.offset(low)
+        return self.map[start:self.blob + self.offset(low + 1)].decode('utf-8')
+
+    def close(self):
+        self.map.close()
+
+
+def load(path):
+    # the compiled table from the build when it was compiled from this .po,
+    # the parsed .po otherwise
+    try:
+        return CompiledCatalog(compiled_path(path), po_checksum(path))
+    except (OSError, ValueError, struct.error):
+        pass
+    return read_po(path)
+
+
+if __name__ == '__main__':
+    for path in sys.argv[1:]:
+        compile_po(path)
@@ -4,8 +4,6 @@
 import os
 import os_tools
 
-OS_RELEASE = os_tools.read_shell_settings('/etc/os-release')
-
 HOME = os.environ.get('HOME', '/storage')
 XDG_CACHE_HOME = os.environ.get('XDG_CACHE_HOME', os.path.join(HOME, '.cache'))
 XDG_CONFIG_HOME = os.environ.get(
@@ -17,3 +15,10 @@ HOSTS_CONF = os.path.join(XDG_CONFIG_HOME, 'hosts.conf')
 
 REGDOMAIN_CONF = os.path.join(XDG_CACHE_HOME, 'regdomain.conf')
 SETREGDOMAIN = '/usr/lib/iw/setregdomain'
+
+
+def __getattr__(name):
+    # OS_RELEASE is read on first use, shared with oe
+    if name == 'OS_RELEASE':
+        return os_tools.read_os_release() or {}
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
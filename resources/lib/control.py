@@ -0,0 +1,215 @@
+# SPDX-License-Identifier: GPL-2.0-or-later
+# Copyright (C) 2020-present Team CoreELEC (https://coreelec.org)
+
+# Control socket of the service, served from the D-Bus asyncio loop.
+#
+# Every request is one line: a command name followed by space separated
+# arguments. Every request gets exactly one response line, in the order the
+# requests came in on that connection, a JSON object holding either
+# "result" or "error". Clients may send several requests without waiting
+# (pipelining) and any number of clients may be connected at once. A
+# client that sends a single command without a newline and closes, like
+# default.py, still gets it run.
+#
+# A line starting with { or [ is a JSON-RPC 2.0 request or batch instead
+# and is answered the JSON-RPC way, notifications get no response line.
+
+import asyncio
+import dbus_utils
+import inspect
+import json
+import log
+import os
+import threading
+
+SOCKET = '/var/run/service.coreelec.settings.sock'
+MAX_REQUEST = 1024 * 1024
+STOP_TIMEOUT = 5
+
+_handlers = {}
+_handlers_lock = threading.Lock()
+_methods = {}
+_server = None
+# open connections and handlers running on the executor, for stop()
+_writers = set()
+_calls = set()
+
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+SERVER_ERROR = -32000
+
+
+class ControlError(Exception):
+    pass
+
+
+class InvalidParams(ControlError):
+    # raised by a JSON-RPC method for params it cannot use
+    pass
+
+
+def register(command, handler):
+    # handler(*arguments) returns something JSON serializable, plain
+    # functions run on an executor thread, coroutine functions on the loop
+    with _handlers_lock:
+        _handlers[command] = handler
+
+
+def unregister(command):
+    with _handlers_lock:
+        _handlers.pop(command, None)
+
+
+def commands():
+    with _handlers_lock:
+        return sorted(_handlers)
+
+
+def register_method(method, handler):
+    # JSON-RPC method, called with the params as positional or keyword
+    # arguments, same threading rules as register()
+    with _handlers_lock:
+        _methods[method] = handler
+
+
+def methods():
+    with _handlers_lock:
+        return sorted(_methods)
+
+
+async def _call(handler, args=(), kwargs={}):
+    if inspect.iscoroutinefunction(handler):
+        return await handler(*args, **kwargs)
+    future = asyncio.get_running_loop().run_in_executor(None, lambda: handler(*args, **kwargs))
+    _calls.add(future)
+    future.add_done_callback(_calls.discard)
+    return await future
+
+
+async def _dispatch(command, arguments):
+    with _handlers_lock:
+        handler = _handlers.get(command)
+    if handler is None:
+        raise ControlError(f'unknown command {command!r}')
+    return await _call(handler, arguments)
+
+
+def _rpc_error(id, code, message):
+    return {'jsonrpc': '2.0', 'id': id, 'error': {'code': code, 'message': message}}
+
+
+async def _rpc_call(request):
+    if not isinstance(request, dict) or request.get('jsonrpc') != '2.0' or not isinstance(request.get('method'), str):
+        return _rpc_error(None, INVALID_REQUEST, 'invalid request')
+    log.log(f'Received {request["method"][:100]}', log.DEBUG)
+    id = request.get('id')
+    with _handlers_lock:
+        handler = _methods.get(request['method'])
+    if handler is None:
+        response = _rpc_error(id, METHOD_NOT_FOUND, f'unknown method {request["method"]!r}')
+    else:
+        params = request.get('params', [])
+        args, kwargs = (params, {}) if isinstance(params, list) else ((), params)
+        try:
+            if not isinstance(params, (list, dict)):
+                raise TypeError('params must be an array or an object')
+            inspect.signature(handler).bind(*args, **kwargs)
+        except TypeError as e:
+            return _rpc_error(id, INVALID_PARAMS, str(e)) if 'id' in request else None
+        try:
+            response = {'jsonrpc': '2.0', 'id': id, 'result': await _call(handler, args, kwargs)}
+        except InvalidParams as e:
+            response = _rpc_error(id, INVALID_PARAMS, str(e))
+        except Exception as e:
+            log.log(f'{request["method"]}: {repr(e)}', log.ERROR)
+            response = _rpc_error(id, SERVER_ERROR, repr(e))
+    return response if 'id' in request else None
+
+
+async def handle_rpc(line):
+    try:
+        request = json.loads(line)
+    except ValueError as e:
+        return _rpc_error(None, PARSE_ERROR, str(e))
+    if not isinstance(request, list):
+        return await _rpc_call(request)
+    if not request:
+        return _rpc_error(None, INVALID_REQUEST, 'empty batch')
+    # one after the other, a batch may set something and read it back
+    responses = [await _rpc_call(call) for call in request]
+    return [response for response in responses if response is not None] or None
+
+
+async def handle_request(line):
+    command, *arguments = line.split()
+    try:
+        return {'result': await _dispatch(command, arguments)}
+    except ControlError as e:
+        return {'error': str(e)}
+    except Exception as e:
+        log.log(f'{command}: {repr(e)}', log.ERROR)
+        return {'error': repr(e)}
+
+
+async def _serve(reader, writer):
+    _writers.add(writer)
+    try:
+        while True:
+            try:
+                line = await reader.readline()
+            except (asyncio.LimitOverrunError, ValueError):
+                writer.write(b'{"error": "request too long"}\n')
+                break
+            if not line:
+                break
+            line = line.decode('utf-8', errors='replace').strip()
+            if not line:
+                continue
+            # arguments may carry passwords, only the method or command is logged
+            if line[0] in '{[':
+                response = await handle_rpc(line)
+                if response is None:
+                    continue
+            else:
+                log.log(f'Received {line.split()[0]}', log.INFO)
+                response = await handle_request(line)
+            writer.write(json.dumps(response, default=str).encode('utf-8') + b'\n')
+            await writer.drain()
+    except (ConnectionError, BrokenPipeError):
+        pass
+    finally:
+        _writers.discard(writer)
+        writer.close()
+
+
+async def _start(path):
+    if os.path.exists(path):
+        os.remove(path)
+    return await asyncio.start_unix_server(_serve, path=path, limit=MAX_REQUEST)
+
+
+async def _stop(server):
+    # also close the open connections and let running handlers finish, so
+    # nothing is written after stop() returns
+    server.close()
+    for writer in list(_writers):
+        writer.close()
+    await server.wait_closed()
+    if _calls:
+        await asyncio.wait(list(_calls), timeout=STOP_TIMEOUT)
+
+
+@log.log_function(log.INFO)
+def start(path=SOCKET):
+    global _server
+    _server = asyncio.run_coroutine_threadsafe(_start(path), dbus_utils.LOOP).result()
+
+
+@log.log_function(log.INFO)
+def stop():
+    global _server
+    server, _server = _server, None
+    if server is not None:
+        asyncio.run_coroutine_threadsafe(_stop(server), dbus_utils.LOOP).result(STOP_TIMEOUT + 5)
@@ -1,10 +1,13 @@
 # SPDX-License-Identifier: GPL-2.0
 # Copyright (C) 2020-present Team LibreELEC
 import asyncio
+import contextlib
 import dbussy
 import log
+import metrics
 import ravel
 import threading
+import wakeups
 
 BUS_NAME = ''
 INTERFACE_AGENT = ''
@@ -64,8 +67,10 @@ class LoopThread(threading.Thread):
 
     @log.log_function(log.INFO)
     async def wait(self):
+        source = wakeups.register('dbus loop stop check')
         while not self.is_stopped:
             await asyncio.sleep(1)
+            source.tick()
 
     @log.log_function(log.INFO)
     def run(self):
@@ -94,18 +99,30 @@ def convert_from_dbussy(data):
     return data
 
 
+@contextlib.contextmanager
+def _measure(interface, method_name):
+    try:
+        with metrics.DBUS_CALLS.time(interface=interface, method=method_name):
+            yield
+    except Exception:
+        metrics.DBUS_ERRORS.inc(interface=interface, method=method_name)
+        raise
+
+
 def call_method(bus_name, path, interface, method_name, *args, **kwargs):
-    interface = BUS[bus_name][path].get_interface(interface)
-    method = getattr(interface, method_name)
-    result = method(*args, **kwargs)
+    with _measure(interface, method_name):
+        proxy = BUS[bus_name][path].get_interface(interface)
+        method = getattr(proxy, method_name)
+        result = method(*args, **kwargs)
     first = next(iter(result or []), None)
     return convert_from_dbussy(first)
 
 
 async def call_async_method(bus_name, path, interface, method_name, *args, **kwargs):
-    interface = await BUS[bus_name][path].get_async_interface(interface)
-    method = getattr(interface, method_name)
-    result = await method(*args, **kwargs)
+    with _measure(interface, method_name):
+        proxy = await BUS[bus_name][path].get_async_interface(interface)
+        method = getattr(proxy, method_name)
+        result = await method(*args, **kwargs)
     first = next(iter(result or []), None)
     return convert_from_dbussy(first)
 
@@ -1,8 +1,16 @@
 # SPDX-License-Identifier: GPL-2.0
 # Copyright (C) 2020-present Team LibreELEC
-import pprint
+import array
+import bisect
+import collections
+import json
+import os
+import reprlib
 import sys
+import threading
+import time
 import traceback
+import wakeups
 
 DEBUG = 0
 INFO = 1
@@ -14,35 +22,324 @@ NONE = 5
 _DEFAULT = DEBUG
 _HEADER = 'SETTINGS: '
 
+# arguments and results can be whole D-Bus property maps, keep them short
+_repr = reprlib.Repr()
+_repr.maxlevel = 3
+_repr.maxdict = 16
+_repr.maxlist = 16
+_repr.maxtuple = 16
+_repr.maxset = 16
+_repr.maxstring = 200
+_repr.maxother = 200
+
+_level = None
+
+# optional per function timing in log_function: call count, total time and
+# a latency histogram per __qualname__, one array row each
+TIMING_BUCKETS = (
+    10_000,
+    100_000,
+    1_000_000,
+    10_000_000,
+    100_000_000,
+    1_000_000_000,
+    10_000_000_000,
+)
+_COUNT = 0
+_TOTAL = 1
+_BUCKETS = 2
+
+_timing = os.environ.get('SETTINGS_TIMING', 'no') != 'no'
+_timings = {}
+_timings_lock = threading.Lock()
+
+# the last DEBUG records, kept whether Kodi logs them or not and only
+# formatted when the ring is dumped; a call keeps its name and a brief of
+# its result (numbers and short strings, else the type and length), so
+# the ring neither keeps objects alive nor costs a repr per call
+RING_SIZE = 4096
+RING_PATH = os.path.join(os.environ.get('XBMC_USER_HOME', '/storage/.kodi'), 'temp', 'service.coreelec.settings.debug.log')
+RING_DUMP_INTERVAL = 60
+_CALL = 0
+_RAISE = 1
+_MESSAGE = 2
+
+_ring = collections.deque(maxlen=RING_SIZE)
+_ring_dumped = None
+_PLAIN = frozenset((type(None), bool, int, float))
+_SIZED = frozenset((str, bytes, list, tuple, dict, set, frozenset))
+BRIEF_STRING = 80
+
+
+
+def _brief(value):
+    # what the ring keeps of a value: itself, (type, length) or its type
+    kind = type(value)
+    if kind in _PLAIN or (kind is str and len(value) <= BRIEF_STRING):
+        return value
+    if kind in _SIZED:
+        return (kind, len(value))
+    return kind
+
+
+def _format_brief(value):
+    if isinstance(value, tuple):
+        return f'<{value[0].__qualname__} len={value[1]}>'
+    if isinstance(value, type):
+        return f'<{value.__qualname__}>'
+    return repr(value)
+
+
+# messages are handed to a single writer thread so slow logging does not
+# hold up the caller, e.g. the D-Bus loop; when the queue is full the
+# oldest messages are dropped and counted
+QUEUE_SIZE = 1000
+
+_queue = collections.deque()
+_queue_lock = threading.Condition()
+_writer = None
+_writing = False
+_stopped = False
+_dropped = 0
+
 
 try:
     import xbmc
-    def _log(message, level=_DEFAULT):
+    def _write(message, level=_DEFAULT):
         xbmc.log(message, level)
+    def _kodi_level():
+        # Kodi drops everything below INFO unless debug logging is enabled
+        response = json.loads(xbmc.executeJSONRPC(json.dumps({
+            'jsonrpc': '2.0',
+            'method': 'Settings.GetSettingValue',
+            'params': {'setting': 'debug.showloginfo'},
+            'id': 1,
+        })))
+        return DEBUG if response['result']['value'] else INFO
 except ModuleNotFoundError:
-    def _log(message, level=_DEFAULT):
+    def _write(message, level=_DEFAULT):
         print(message)
+    def _kodi_level():
+        return DEBUG
+
+
+def emit(message, level=_DEFAULT):
+    global _dropped, _writer
+    with _queue_lock:
+        if not _stopped:
+            if len(_queue) >= QUEUE_SIZE:
+                _queue.popleft()
+                _dropped += 1
+            _queue.append((message, level))
+            if _writer is None:
+                _writer = threading.Thread(target=_drain, name='log writer', daemon=True)
+                _writer.start()
+            _queue_lock.notify()
+            return
+    # after stop() there is nobody left to drain the queue
+    _write(message, level)
+
+
+_log = emit
+
+
+def _drain():
+    global _writing
+    reported = 0
+    source = wakeups.register('log writer')
+    while True:
+        with _queue_lock:
+            _writing = False
+            _queue_lock.notify_all()
+            while not _queue and not _stopped:
+                _queue_lock.wait()
+                source.tick()
+            if not _queue:
+                return
+            records = list(_queue)
+            _queue.clear()
+            dropped = _dropped
+            _writing = True
+        if dropped != reported:
+            records.insert(0, (f'{_HEADER}log queue full, dropped {dropped - reported} messages', WARNING))
+            reported = dropped
+        for message, level in records:
+            try:
+                _write(message, level)
+            except Exception:
+                pass
+
+
+def dropped():
+    return _dropped
+
+
+def flush(timeout=5):
+    with _queue_lock:
+        return _queue_lock.wait_for(lambda: not _queue and not _writing, timeout)
+
+
+def stop(timeout=5):
+    # drain what is queued and write synchronously from now on
+    global _stopped, _writer
+    flush(timeout)
+    with _queue_lock:
+        _stopped = True
+        _queue_lock.notify_all()
+        writer = _writer
+        _writer = None
+    if writer is not None:
+        writer.join(timeout)
+
+
+def refresh_level(level=None):
+    global _level
+    if level is None:
+        try:
+            level = _kodi_level()
+        except Exception:
+            level = DEBUG
+    _level = level
+    return level
+
+
+def effective_level():
+    if _level is None:
+        return refresh_level()
+    return _level
+
+
+def remember(message, *args):
+    # message % args is only done when the ring is dumped
+    _ring.append((time.time(), threading.get_ident(), _MESSAGE, (message, args)))
+
+
+def _format_record(record, threads):
+    stamp, ident, kind, data = record
+    prefix = f'{time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(stamp))}.{int(stamp % 1 * 1000):03d} T:{threads.get(ident, ident)} '
+    if kind == _MESSAGE:
+        message, args = data
+        return f'{prefix}{message % args if args else message}'
+    name, result = data
+    if kind == _RAISE:
+        return f'{prefix}{name} # {result}'
+    return f'{prefix}{name} > {_format_brief(result)}'
+
+
+def dump_ring(path=None, records=None):
+    path = path or RING_PATH
+    if records is None:
+        records = list(_ring)
+    threads = {thread.ident: thread.name for thread in threading.enumerate()}
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as output:
+        for record in records:
+            try:
+                output.write(f'{_format_record(record, threads)}\n')
+            except Exception as e:
+                output.write(f'unformattable record: {repr(e)}\n')
+    return path
+
+
+def _dump_ring_on_error():
+    # at most once per RING_DUMP_INTERVAL and off the failing thread
+    global _ring_dumped
+    now = time.monotonic()
+    if _ring_dumped is not None and now - _ring_dumped < RING_DUMP_INTERVAL:
+        return
+    _ring_dumped = now
+    threading.Thread(target=dump_ring, args=(None, list(_ring)), name='ring dump', daemon=True).start()
 
 
 def log(message, level=_DEFAULT):
+    if level == DEBUG:
+        remember('%s # %s', sys._getframe().f_back.f_code.co_name, message)
+    if level < effective_level():
+        return
     _log(f'{_HEADER}{sys._getframe().f_back.f_code.co_name} # {message}', level)
 
 
+def enable_timing(enabled=True):
+    global _timing
+    _timing = enabled
+
+
+def _record(name, elapsed):
+    bucket = _BUCKETS + bisect.bisect_right(TIMING_BUCKETS, elapsed)
+    with _timings_lock:
+        row = _timings.get(name)
+        if row is None:
+            row = _timings[name] = array.array('Q', bytes(8 * (_BUCKETS + len(TIMING_BUCKETS) + 1)))
+        row[_COUNT] += 1
+        row[_TOTAL] += elapsed
+        row[bucket] += 1
+
+
+def timings():
+    with _timings_lock:
+        rows = {name: row.tolist() for name, row in _timings.items()}
+    return {name: {
+        'count': row[_COUNT],
+        'total_ns': row[_TOTAL],
+        'buckets': dict(zip(TIMING_BUCKETS + (None,), row[_BUCKETS:])),
+    } for name, row in rows.items()}
+
+
+def reset_timings():
+    with _timings_lock:
+        _timings.clear()
+
+
+def _format_ns(value):
+    for unit, scale in (('s', 1_000_000_000), ('ms', 1_000_000), ('us', 1_000)):
+        if value >= scale:
+            return f'{value / scale:g}{unit}'
+    return f'{value}ns'
+
+
+def dump_timings(path=None):
+    # slowest functions by total time first
+    limits = [f'<{_format_ns(limit)}' for limit in TIMING_BUCKETS] + [f'>={_format_ns(TIMING_BUCKETS[-1])}']
+    lines = [' '.join([f'{"function":60}', f'{"calls":>8}', f'{"total ms":>10}', f'{"mean us":>10}'] + [f'{limit:>7}' for limit in limits])]
+    rows = sorted(timings().items(), key=lambda item: item[1]['total_ns'], reverse=True)
+    for name, row in rows:
+        columns = [f'{name:60}', f'{row["count"]:8}', f'{row["total_ns"] / 1e6:10.1f}', f'{row["total_ns"] / row["count"] / 1e3:10.1f}']
+        columns += [f'{count:7}' for count in row['buckets'].values()]
+        lines.append(' '.join(columns))
+    text = '\n'.join(lines) + '\n'
+    if path is not None:
+        with open(path, 'w') as output:
+            output.write(text)
+    return text
+
+
 def log_function(level=_DEFAULT):
     def _log_function_1(function):
         header = f'{_HEADER}{function.__qualname__} '
+        name = function.__qualname__
         def _log_function_2(*args, **kwargs):
+            started = time.perf_counter_ns() if _timing else 0
             try:
-                _log(f'{header}-', level)
-                for arg in args:
-                    _log(f'{header}< {pprint.pformat(arg)}', level)
-                for key, value in kwargs.items():
-                    _log(f'{header}< {key}={pprint.pformat(value)}', level)
-                result = function(*args, **kwargs)
-                _log(f'{header}> {pprint.pformat(result)}', level)
+                if level < effective_level():
+                    result = function(*args, **kwargs)
+                else:
+                    _log(f'{header}-', level)
+                    for arg in args:
+                        _log(f'{header}< {_repr.repr(arg)}', level)
+                    for key, value in kwargs.items():
+                        _log(f'{header}< {key}={_repr.repr(value)}', level)
+                    result = function(*args, **kwargs)
+                    _log(f'{header}> {_repr.repr(result)}', level)
+                if level == DEBUG:
+                    _ring.append((time.time(), threading.get_ident(), _CALL, (name, _brief(result))))
                 return result
             except Exception as e:
                 _log(f'{header}# {repr(e)}', ERROR)
                 _log(traceback.format_exc(), ERROR)
+                _ring.append((time.time(), threading.get_ident(), _RAISE, (name, repr(e))))
+                _dump_ring_on_error()
+            finally:
+                if started:
+                    _record(name, time.perf_counter_ns() - started)
         return _log_function_2
     return _log_function_1
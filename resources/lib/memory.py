@@ -0,0 +1,92 @@
+# SPDX-License-Identifier: GPL-2.0-or-later
+# Copyright (C) 2020-present Team CoreELEC (https://coreelec.org)
+
+import log
+import os
+import re
+import threading
+import time
+import tracemalloc
+
+TEMP = os.path.join(os.environ.get('XBMC_USER_HOME', '/storage/.kodi'), 'temp')
+
+FRAMES = 1
+TOP = 25
+
+# snapshot names end up in the file name of a diff
+_name = re.compile(r'[A-Za-z0-9_-]+')
+
+_snapshots = {}
+_snapshots_lock = threading.Lock()
+
+
+def status():
+    # VmRSS, VmHWM, ... in kB from /proc/self/status
+    values = {}
+    with open('/proc/self/status') as proc_status:
+        for line in proc_status:
+            name, _, value = line.partition(':')
+            if name.startswith('Vm') or name.startswith('Rss'):
+                values[name] = int(value.split()[0])
+    return values
+
+
+def start(frames=FRAMES):
+    if tracemalloc.is_tracing():
+        return False
+    tracemalloc.start(frames)
+    log.log(f'tracemalloc started, {frames} frames', log.INFO)
+    return True
+
+
+def stop():
+    tracemalloc.stop()
+    with _snapshots_lock:
+        _snapshots.clear()
+    log.log('tracemalloc stopped', log.INFO)
+
+
+def snapshot(name):
+    if not _name.fullmatch(name):
+        raise ValueError(f'snapshot name {name!r} is not [A-Za-z0-9_-]+')
+    if not tracemalloc.is_tracing():
+        start()
+    taken = tracemalloc.take_snapshot().filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+        tracemalloc.Filter(False, '<unknown>'),
+    ))
+    with _snapshots_lock:
+        _snapshots[name] = (time.time(), status(), taken)
+    size = sum(stat.size for stat in taken.statistics('filename'))
+    log.log(f'memory snapshot {name}: {size // 1024} KiB traced, RSS {_snapshots[name][1].get("VmRSS")} kB', log.INFO)
+    return name
+
+
+def snapshots():
+    with _snapshots_lock:
+        return list(_snapshots)
+
+
+def diff(old, new, top=TOP, path=None):
+    with _snapshots_lock:
+        old_time, old_status, old_snapshot = _snapshots[old]
+        new_time, new_status, new_snapshot = _snapshots[new]
+    statistics = new_snapshot.compare_to(old_snapshot, 'lineno')
+    lines = [
+        f'memory diff {old} -> {new}, {new_time - old_time:.1f}s apart',
+        f'RSS {old_status.get("VmRSS")} kB -> {new_status.get("VmRSS")} kB '
+        f'({new_status.get("VmRSS", 0) - old_status.get("VmRSS", 0):+d} kB), peak {new_status.get("VmHWM")} kB',
+        f'traced {sum(stat.size for stat in statistics) / 1024:.1f} KiB '
+        f'({sum(stat.size_diff for stat in statistics) / 1024:+.1f} KiB)',
+        '',
+        f'top {top} by growth:',
+    ]
+    lines += [str(stat) for stat in statistics[:top]]
+    text = '\n'.join(lines) + '\n'
+    path = path or os.path.join(TEMP, f'service.coreelec.settings.memory-{old}-{new}.txt')
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as output:
+        output.write(text)
+    log.log(f'memory diff {old} -> {new} written to {path}', log.INFO)
+    return path
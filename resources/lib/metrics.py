@@ -0,0 +1,201 @@
+# SPDX-License-Identifier: GPL-2.0-or-later
+# Copyright (C) 2020-present Team CoreELEC (https://coreelec.org)
+
+# Counters, gauges and histograms of the resident service, exported in the
+# Prometheus text format by the "metrics" command of the control socket
+# and, if SETTINGS_METRICS_PORT is set, on http://127.0.0.1:PORT/metrics
+
+import asyncio
+import bisect
+import contextlib
+import log
+import os
+import threading
+import time
+
+PREFIX = 'coreelec_'
+HOST = '127.0.0.1'
+PORT = int(os.environ.get('SETTINGS_METRICS_PORT') or 0)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SLOW_BUCKETS = (1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+
+_metrics = []
+_lock = threading.Lock()
+_server = None
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+class Metric(object):
+
+    kind = 'untyped'
+
+    def __init__(self, name, help, labels=()):
+        self.name = PREFIX + name
+        self.help = help
+        self.labels = labels
+        self.values = {}
+        _metrics.append(self)
+
+    def _key(self, labels):
+        return tuple(str(labels[label]) for label in self.labels)
+
+    def _label_text(self, key, *extra):
+        pairs = [f'{label}="{_escape(value)}"' for label, value in zip(self.labels, key)]
+        pairs.extend(extra)
+        return '{' + ','.join(pairs) + '}' if pairs else ''
+
+    def samples(self):
+        for key, value in sorted(self.values.items()):
+            yield self.name + self._label_text(key), value
+
+    def expose(self):
+        with _lock:
+            samples = list(self.samples())
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.kind}']
+        lines.extend(f'{name} {_number(value)}' for name, value in samples)
+        return lines
+
+    def reset(self):
+        with _lock:
+            self.values.clear()
+
+
+class Counter(Metric):
+
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with _lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with _lock:
+            self.values[key] = value
+
+
+class Histogram(Metric):
+
+    kind = 'histogram'
+
+    def __init__(self, name, help, labels=(), buckets=BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = buckets
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with _lock:
+            counts = self.values.get(key)
+            if counts is None:
+                # one count per bucket, one for +Inf, then the sum
+                counts = self.values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            counts[bisect.bisect_left(self.buckets, value)] += 1
+            counts[-1] += value
+
+    @contextlib.contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def samples(self):
+        for key, counts in sorted(self.values.items()):
+            total = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                total += count
+                yield self.name + '_bucket' + self._label_text(key, f'le="{_number(bound)}"'), total
+            yield self.name + '_sum' + self._label_text(key), counts[-1]
+            yield self.name + '_count' + self._label_text(key), total
+
+
+SETTINGS_LOADS = Counter('settings_loads_total', 'Settings document lookups by where they were answered from.', ('source',))
+SETTINGS_SAVES = Counter('settings_saves_total', 'Changes saved to the settings document.')
+SETTINGS_JOURNAL_APPENDS = Counter('settings_journal_appends_total', 'Records appended to the settings journal.')
+SETTINGS_WRITES = Histogram('settings_write_seconds', 'Time to write the settings file.')
+DBUS_CALLS = Histogram('dbus_call_seconds', 'D-Bus method call latency.', ('interface', 'method'))
+DBUS_ERRORS = Counter('dbus_call_errors_total', 'D-Bus method calls that raised.', ('interface', 'method'))
+DOWNLOADS = Counter('settings_downloads_total', 'Downloads by outcome.', ('result',))
+DOWNLOAD_BYTES = Counter('settings_download_bytes_total', 'Bytes downloaded.')
+DOWNLOAD_SECONDS = Histogram('settings_download_seconds', 'Download duration.', buckets=SLOW_BUCKETS)
+DOWNLOAD_THROUGHPUT = Gauge('settings_download_throughput_bytes_per_second', 'Throughput of the last completed download.')
+BACKUP_SECONDS = Histogram('settings_backup_seconds', 'Backup duration.', buckets=SLOW_BUCKETS)
+MODULE_LOAD_SECONDS = Gauge('settings_module_load_seconds', 'Time to construct a settings module.', ('module',))
+MODULE_START_SECONDS = Gauge('settings_module_start_seconds', 'Time spent in the start_service of a settings module.', ('module',))
+PREWARM_LOADS = Histogram('settings_prewarm_load_seconds', 'Background reloads of the values of a settings module.', ('module',))
+WINDOW_FIRST_FRAME = Histogram('settings_window_first_frame_seconds', 'Time from opening the settings window to its populated first frame.')
+
+
+def exposition():
+    lines = []
+    for metric in _metrics:
+        lines.extend(metric.expose())
+    return '\n'.join(lines) + '\n'
+
+
+def reset():
+    for metric in _metrics:
+        metric.reset()
+
+
+async def _serve_http(reader, writer):
+    # just enough HTTP/1.0 for a scraper: GET /metrics, one request per connection
+    try:
+        request = await asyncio.wait_for(reader.readline(), 5)
+        while (await asyncio.wait_for(reader.readline(), 5)).strip():
+            pass
+        method, path = (request.decode('latin-1').split() + ['', ''])[:2]
+        if method != 'GET':
+            status, body = '405 Method Not Allowed', b''
+        elif path.split('?')[0] not in ('/', '/metrics'):
+            status, body = '404 Not Found', b''
+        else:
+            status, body = '200 OK', exposition().encode('utf-8')
+        writer.write(f'HTTP/1.0 {status}\r\nContent-Type: {CONTENT_TYPE}\r\n'
+                     f'Content-Length: {len(body)}\r\nConnection: close\r\n\r\n'.encode('latin-1') + body)
+        await writer.drain()
+    except (asyncio.TimeoutError, ConnectionError, ValueError):
+        pass
+    finally:
+        writer.close()
+
+
+async def _stop(server):
+    server.close()
+    await server.wait_closed()
+
+
+@log.log_function(log.INFO)
+def start_server(loop, port=PORT, host=HOST):
+    global _server
+    if _server is None:
+        _server = asyncio.run_coroutine_threadsafe(asyncio.start_server(_serve_http, host, port), loop).result()
+    return _server
+
+
+@log.log_function(log.INFO)
+def stop_server(loop):
+    global _server
+    server, _server = _server, None
+    if server is not None:
+        asyncio.run_coroutine_threadsafe(_stop(server), loop).result(5)
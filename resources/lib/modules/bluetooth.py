@@ -16,6 +16,7 @@ import oeWindows
 import os
 import threading
 import time
+import wakeups
 import xbmc
 import xbmcgui
 from dbussy import DBusError
@@ -231,9 +232,9 @@ class bluetooth(modules.Module):
 
     @log.log_function()
     def menu_connections(self, focusItem=None):
-        if not hasattr(oe, 'winOeMain'):
-            return 0
-        if not oe.winOeMain.visible:
+        # vars(), also runs from the standby path, which must not create the window
+        winOeMain = vars(oe).get('winOeMain')
+        if winOeMain is None or not winOeMain.visible:
             return 0
         if not dbus_bluez.system_has_bluez():
             oe.winOeMain.getControl(1301).setLabel(oe._(32346))
@@ -694,7 +695,9 @@ class discoveryThread(threading.Thread):
         busName = dbus.service.BusName("com.service.coreelec.settings.xdbus.stoploop", bus=self.dbusSystemBus)
         dbus.service.Object(busName, "/com/service/coreelec/settings/xdbus/stoploop")
 
+        source = wakeups.register('bluetooth discovery')
         while not self.stopped and not oe.xbmcm.abortRequested():
+            source.tick()
             current_time = time.time()
             if current_time > self.last_run + 5:
                 if self.main_menu.getSelectedItem().getProperty('modul') != 'bluetooth' or not hasattr(oe.dictModules['bluetooth'], 'discovery_thread'):
@@ -723,7 +726,9 @@ class pinkeyTimer(threading.Thread):
     @log.log_function()
     def run(self):
         self.endtime = self.start_time + self.runtime
+        source = wakeups.register('bluetooth pinkey timer')
         while not self.stopped and not oe.xbmcm.abortRequested():
+            source.tick()
             current_time = time.time()
             percent = round(100 / self.runtime * (self.endtime - current_time), 0)
             self.parent.pinkey_window.getControl(1704).setPercent(percent)
@@ -477,14 +477,15 @@ class hardware:
     @log.log_function()
     def load_values(self):
         hide_power_section = True
+        settings = oe.read_settings('hardware')
 
         if not os.path.exists('/sys/class/fan'):
             self.struct['fan']['hidden'] = 'true'
         else:
-            value = oe.read_setting('hardware', 'fan_mode')
+            value = settings.get('fan_mode')
             if not value is None:
                 self.struct['fan']['settings']['fan_mode']['value'] = value
-            value = oe.read_setting('hardware', 'fan_level')
+            value = settings.get('fan_level')
             if not value is None:
                 self.struct['fan']['settings']['fan_level']['value'] = value
 
@@ -606,23 +607,23 @@ class hardware:
                 available_gov = oe.load_file(sys_device + 'scaling_available_governors')
                 self.struct['performance']['settings']['cpu_governor']['values'] = available_gov.split()
 
-            value = oe.read_setting('hardware', 'cpu_governor')
+            value = settings.get('cpu_governor')
             if value is None:
                 value = oe.load_file(sys_device + 'scaling_governor')
 
             self.struct['performance']['settings']['cpu_governor']['value'] = value
 
-        value = oe.read_setting('hardware', 'disk_park')
+        value = settings.get('disk_park')
         if not value is None:
             self.struct['hdd']['settings']['disk_park']['value'] = value
 
-        value = oe.read_setting('hardware', 'disk_park_time')
+        value = settings.get('disk_park_time')
         if not value is None:
             self.struct['hdd']['settings']['disk_park_time']['value'] = value
         else:
             self.struct['hdd']['settings']['disk_park_time']['value'] = '10'
 
-        value = oe.read_setting('hardware', 'disk_idle')
+        value = settings.get('disk_idle')
         if value is None or value == '':
             value = 'Disabled'
 
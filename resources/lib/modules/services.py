@@ -7,6 +7,7 @@
 import log
 import modules
 import oe
+import prewarm
 import os
 import subprocess
 import xbmc
@@ -290,7 +291,7 @@ class services(modules.Module):
 
     @log.log_function()
     def do_init(self):
-        self.load_values()
+        prewarm.ensure_values('services')
 
     @log.log_function()
     def set_value(self, listItem):
@@ -356,10 +357,10 @@ class services(modules.Module):
                     self.struct['bluez']['settings']['obex_enabled']['hidden'] = True
                     self.struct['bluez']['settings']['obex_root']['hidden'] = True
 
-                value = oe.read_setting('bluetooth', 'idle_timeout')
+                value = oe.read_settings('bluetooth').get('idle_timeout')
                 if not value:
                     value = '0'
-                self.struct['bluez']['settings']['idle_timeout']['value'] = oe.read_setting('bluetooth', 'idle_timeout')
+                self.struct['bluez']['settings']['idle_timeout']['value'] = value
             else:
                 self.struct['bluez']['hidden'] = 'true'
 
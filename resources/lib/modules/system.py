@@ -6,6 +6,7 @@
 
 import hostname
 import log
+import metrics
 import modules
 import oe
 import os
@@ -230,6 +231,7 @@ class system(modules.Module):
 
     @log.log_function()
     def load_values(self):
+        settings = oe.read_settings('system')
         # Keyboard Layout
         (
             arrLayouts,
@@ -238,22 +240,22 @@ class system(modules.Module):
             ) = self.get_keyboard_layouts()
         if not arrTypes is None:
             self.struct['keyboard']['settings']['KeyboardType']['values'] = arrTypes
-            value = oe.read_setting('system', 'KeyboardType')
+            value = settings.get('KeyboardType')
             if not value is None:
                 self.struct['keyboard']['settings']['KeyboardType']['value'] = value
         if not arrLayouts is None:
             self.struct['keyboard']['settings']['KeyboardLayout1']['values'] = arrLayouts
             self.struct['keyboard']['settings']['KeyboardLayout2']['values'] = arrLayouts
-            value = oe.read_setting('system', 'KeyboardLayout1')
+            value = settings.get('KeyboardLayout1')
             if not value is None:
                 self.struct['keyboard']['settings']['KeyboardLayout1']['value'] = value
-            value = oe.read_setting('system', 'KeyboardVariant1')
+            value = settings.get('KeyboardVariant1')
             if not value is None:
                 self.struct['keyboard']['settings']['KeyboardVariant1']['value'] = value
-            value = oe.read_setting('system', 'KeyboardLayout2')
+            value = settings.get('KeyboardLayout2')
             if not value is None:
                 self.struct['keyboard']['settings']['KeyboardLayout2']['value'] = value
-            value = oe.read_setting('system', 'KeyboardVariant2')
+            value = settings.get('KeyboardVariant2')
             if not value is None:
                 self.struct['keyboard']['settings']['KeyboardVariant2']['value'] = value
             if not arrTypes == None:
@@ -455,11 +457,13 @@ class system(modules.Module):
                 self.backup_dlg.create('CoreELEC', oe._(32375))
                 if not os.path.exists(self.BACKUP_DESTINATION):
                     os.makedirs(self.BACKUP_DESTINATION)
+                oe.flush_config()
                 self.backup_file = oe.timestamp() + '.tar'
-                tar = tarfile.open(bckDir + self.backup_file, 'w')
-                for directory in self.BACKUP_DIRS:
-                    self.tar_add_folder(tar, directory)
-                tar.close()
+                with metrics.BACKUP_SECONDS.time():
+                    tar = tarfile.open(bckDir + self.backup_file, 'w')
+                    for directory in self.BACKUP_DIRS:
+                        self.tar_add_folder(tar, directory)
+                    tar.close()
                 self.backup_dlg.close()
                 del self.backup_dlg
         finally:
@@ -18,6 +18,7 @@ import tarfile
 import oeWindows
 import threading
 import subprocess
+import wakeups
 import shutil
 from xml.dom import minidom
 import datetime
@@ -271,39 +272,41 @@ class updates(modules.Module):
         self.hardware_flags = self.get_hardware_flags()
         oe.dbg_log('system::load_values', f'loaded hardware_flag {self.hardware_flags}', oe.LOGDEBUG)
 
+        settings = oe.read_settings('updates')
+
         # AutoUpdate
 
-        value = oe.read_setting('updates', 'AutoUpdate')
+        value = settings.get('AutoUpdate')
         if not value is None:
             self.struct['update']['settings']['AutoUpdate']['value'] = value
-        value = oe.read_setting('updates', 'SubmitStats')
+        value = settings.get('SubmitStats')
         if not value is None:
             self.struct['update']['settings']['SubmitStats']['value'] = value
-        value = oe.read_setting('updates', 'UpdateNotify')
+        value = settings.get('UpdateNotify')
         if not value is None:
             self.struct['update']['settings']['UpdateNotify']['value'] = value
         if os.path.isfile(f'{self.LOCAL_UPDATE_DIR}/SYSTEM'):
             self.update_in_progress = True
-        value = oe.read_setting('updates', 'Update2NextStable')
+        value = settings.get('Update2NextStable')
         if not value is None:
             self.struct['update']['settings']['Update2NextStable']['value'] = value
 
         # Manual Update
 
-        value = oe.read_setting('updates', 'Channel')
+        value = settings.get('Channel')
         if not value is None:
             self.struct['update']['settings']['Channel']['value'] = value
-        value = oe.read_setting('updates', 'ShowCustomChannels')
+        value = settings.get('ShowCustomChannels')
         if not value is None:
             self.struct['update']['settings']['ShowCustomChannels']['value'] = value
 
-        value = oe.read_setting('updates', 'CustomChannel1')
+        value = settings.get('CustomChannel1')
         if not value is None:
             self.struct['update']['settings']['CustomChannel1']['value'] = value
-        value = oe.read_setting('updates', 'CustomChannel2')
+        value = settings.get('CustomChannel2')
         if not value is None:
             self.struct['update']['settings']['CustomChannel2']['value'] = value
-        value = oe.read_setting('updates', 'CustomChannel3')
+        value = settings.get('CustomChannel3')
         if not value is None:
             self.struct['update']['settings']['CustomChannel3']['value'] = value
 
@@ -656,7 +659,9 @@ class updateThread(threading.Thread):
 
     @log.log_function()
     def run(self):
+        source = wakeups.register('update check')
         while self.stopped == False:
+            source.tick()
             if not xbmc.Player().isPlaying():
                 oe.dictModules['updates'].check_updates_v2()
             if not hasattr(oe.dictModules['updates'], 'update_in_progress'):
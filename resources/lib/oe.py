@@ -10,22 +10,26 @@ import xbmc
 import xbmcaddon
 import xbmcgui
 import xbmcvfs
+import functools
 import os
 import re
-import locale
 import sys
+import threading
 import urllib.request, urllib.error, urllib.parse
 import time
 import tarfile
 import traceback
 import subprocess
+import catalog
 import defaults
+import log
+import metrics
+import os_tools
+import prewarm
+import settings_store
 import shutil
 import hashlib, binascii
 
-from xml.dom import minidom
-import imp
-
 from xbmc import LOGDEBUG, LOGINFO, LOGWARNING, LOGERROR
 import xml.etree.ElementTree as ET
 
@@ -35,12 +39,8 @@ __addon__ = xbmcaddon.Addon(id=__scriptid__)
 __cwd__ = __addon__.getAddonInfo('path')
 __oe__ = sys.modules[globals()['__name__']]
 __media__ = f'{__cwd__}/resources/skins/Default/media'
-xbmcDialog = xbmcgui.Dialog()
-
-xbmcm = xbmc.Monitor()
 
 is_service = False
-conf_lock = False
 xbmcIsPlaying = 0
 input_request = False
 dictModules = {}
@@ -65,12 +65,6 @@ CANCEL = (
 
 ###############################################################################
 ########################## initialize module ##################################
-## set default encoding
-
-encoding = locale.getpreferredencoding(do_setlocale=True)
-imp.reload(sys)
-# sys.setdefaultencoding(encoding)
-
 ## load oeSettings modules
 
 import oeWindows
@@ -85,10 +79,11 @@ class PINStorage:
 
         self.now = 0.0
 
-        self.enabled = self.read('enable')
-        self.salthash = self.read('pin')
-        self.numFail = self.read('numFail')
-        self.timeFail = self.read('timeFail')
+        values = read_settings(self.module)
+        self.enabled = self.read('enable', values)
+        self.salthash = self.read('pin', values)
+        self.numFail = self.read('numFail', values)
+        self.timeFail = self.read('timeFail', values)
 
         self.enabled = '0' if (self.enabled is None or self.enabled != '1') else '1'
         self.salthash = None if (self.salthash is None or self.salthash == '') else self.salthash
@@ -99,13 +94,19 @@ class PINStorage:
         if self.isEnabled() != self.isSet():
             self.disable()
 
-    def read(self, item):
-        value = read_setting(self.module, f'{self.prefix}_{item}')
+    def read(self, item, values=None):
+        if values is None:
+            value = read_setting(self.module, f'{self.prefix}_{item}')
+        else:
+            value = values.get(f'{self.prefix}_{item}')
         return None if value == '' else value
 
     def write(self, item, value):
         return write_setting(self.module, f'{self.prefix}_{item}', str(value) if value else '')
 
+    def write_items(self, items):
+        return write_settings(self.module, {f'{self.prefix}_{item}': str(value) if value else '' for item, value in items.items()})
+
     def isEnabled(self):
         return self.enabled == '1'
 
@@ -118,10 +119,11 @@ class PINStorage:
             self.write('enable', self.enabled)
 
     def disable(self):
-        if self.isEnabled():
-            self.enabled = '0'
-            self.write('enable', self.enabled)
-        self.set(None)
+        with settings_transaction():
+            if self.isEnabled():
+                self.enabled = '0'
+                self.write('enable', self.enabled)
+            self.set(None)
 
     def set(self, value):
         oldSaltHash = self.salthash
@@ -147,15 +149,13 @@ class PINStorage:
     def fail(self):
         self.numFail += 1
         self.timeFail = time.time()
-        self.write('numFail', self.numFail)
-        self.write('timeFail', self.timeFail)
+        self.write_items({'numFail': self.numFail, 'timeFail': self.timeFail})
 
     def success(self):
         if self.numFail != 0 or self.timeFail != 0.0:
             self.numFail = 0
             self.timeFail = 0.0
-            self.write('numFail', self.numFail)
-            self.write('timeFail', self.timeFail)
+            self.write_items({'numFail': self.numFail, 'timeFail': self.timeFail})
 
     def isDelayed(self):
         self.now = time.time()
@@ -266,37 +266,48 @@ class ProgressDialog:
             self.cancelled = self.dialog.iscanceled()
         return self.cancelled
 
+_catalog = (None, {})
+# a lookup in a compiled catalog must not run while it is closed
+_catalog_lock = threading.RLock()
+
+
+def load_catalog(language):
+    global _catalog
+    with _catalog_lock:
+        if _catalog[0] != language:
+            try:
+                strings = catalog.load(catalog.po_path(__cwd__, language))
+            except Exception as e:
+                dbg_log('oe::load_catalog', f'ERROR: ({repr(e)})')
+                strings = {}
+            if isinstance(_catalog[1], catalog.CompiledCatalog):
+                _catalog[1].close()
+            _catalog = (language, strings)
+        return _catalog[1]
+
+
 def _(code):
     wizardComp = read_setting('coreelec', 'wizard_completed')
-    if wizardComp == "True":
-        codeNew = __addon__.getLocalizedString(code)
-    else:
+    if wizardComp != "True":
         curLang = read_setting("system", "language")
-        if curLang is not None:
-            lang_file = os.path.join(__cwd__, 'resources', 'language', str(curLang), 'strings.po')
-            with open(lang_file, encoding='utf-8') as fp:
-                contents = fp.read().split('\n\n')
-                for strings in contents:
-                    if str(code) in strings:
-                        subString = strings.split('msgstr ')[1]
-                        subStringClean = re.sub('"', '', subString)
-                        codeNew = subStringClean
-                        break
-                    else:
-                        codeNew = __addon__.getLocalizedString(code)
-        else:
-            codeNew = __addon__.getLocalizedString(code)
-    return codeNew
+        if curLang:
+            with _catalog_lock:
+                codeNew = load_catalog(curLang).get(int(code))
+            if codeNew is not None:
+                return codeNew
+    return __addon__.getLocalizedString(code)
 
 
 def dbg_log(source, text, level=LOGERROR):
-    if level == LOGDEBUG and os.environ.get('DEBUG', 'no') == 'no':
-        return
-    xbmc.log(f"## CoreELEC Addon ## {source} ## {text}", level)
+    if level == LOGDEBUG:
+        log.remember('## CoreELEC Addon ## %s ## %s', source, text)
+        if os.environ.get('DEBUG', 'no') == 'no':
+            return
+    log.emit(f"## CoreELEC Addon ## {source} ## {text}", level)
     if level == LOGERROR:
         tracedata = traceback.format_exc()
         if tracedata != "NoneType: None\n":
-            xbmc.log(tracedata, level)
+            log.emit(tracedata, level)
 
 def notify(title, message, icon='icon'):
     try:
@@ -354,6 +365,7 @@ def set_service_option(service, option, value):
             lines.append(f'{option}={value}')
         with open(conf_file_name, 'w') as conf_file:
             conf_file.write('\n'.join(lines) + '\n')
+        prewarm.invalidate('services')
     except Exception as e:
         dbg_log('oe::set_service_option', f'ERROR: ({repr(e)})')
 
@@ -421,6 +433,7 @@ def set_service(service, options, state):
             cfn = f'{CONFIG_CACHE}/services/{service}.disabled'
             if os.path.exists(cfo):
                 os.rename(cfo, cfn)
+        prewarm.invalidate('services')
         if not __oe__.is_service:
             if service in defaults._services:
                 for svc in defaults._services[service]:
@@ -619,9 +632,13 @@ def download_file(source, destination, silent=False):
         progress.setSize(int(response.getheader('Content-Length').strip()))
 
         last_percent = 0
+        started = time.monotonic()
+        size = 0
 
-        while not (progress.iscanceled() or xbmcm.abortRequested()):
+        while not (progress.iscanceled() or monitor().abortRequested()):
             part = response.read(32768)
+            size += len(part)
+            metrics.DOWNLOAD_BYTES.inc(len(part))
 
             progress.sample(part)
 
@@ -641,13 +658,19 @@ def download_file(source, destination, silent=False):
         local_file.close()
         response.close()
 
-        if progress.iscanceled() or xbmcm.abortRequested():
+        if progress.iscanceled() or monitor().abortRequested():
+            metrics.DOWNLOADS.inc(result='canceled')
             os.remove(destination)
             return None
 
+        elapsed = time.monotonic() - started
+        metrics.DOWNLOADS.inc(result='done')
+        metrics.DOWNLOAD_SECONDS.observe(elapsed)
+        metrics.DOWNLOAD_THROUGHPUT.set(size / elapsed if elapsed else 0)
         return destination
 
     except Exception as e:
+        metrics.DOWNLOADS.inc(result='failed')
         dbg_log(f'oe::download_file({source},{destination})', f'ERROR: ({repr(e)})')
 
 
@@ -667,7 +690,7 @@ def copy_file(source, destination, silent=False):
 
         last_percent = 0
 
-        while not (progress.iscanceled() or xbmcm.abortRequested()):
+        while not (progress.iscanceled() or monitor().abortRequested()):
             part = source_file.read(32768)
 
             progress.sample(part)
@@ -688,7 +711,7 @@ def copy_file(source, destination, silent=False):
         source_file.close()
         destination_file.close()
 
-        if progress.iscanceled() or xbmcm.abortRequested():
+        if progress.iscanceled() or monitor().abortRequested():
             os.remove(destination)
             return None
 
@@ -702,10 +725,13 @@ def start_service():
     global dictModules, __oe__
     try:
         __oe__.is_service = True
+        settings_store.watch(configFile)
         for strModule in sorted(dictModules, key=lambda x: list(dictModules[x].menu.keys())):
             module = dictModules[strModule]
             if hasattr(module, 'start_service') and module.ENABLED:
+                started = time.monotonic()
                 module.start_service()
+                metrics.MODULE_START_SECONDS.set(time.monotonic() - started, module=strModule)
         __oe__.is_service = False
     except Exception as e:
         dbg_log('oe::start_service', f'ERROR: ({repr(e)})')
@@ -718,6 +744,9 @@ def stop_service():
             module = dictModules[strModule]
             if hasattr(module, 'stop_service') and module.ENABLED:
                 module.stop_service()
+        settings_store.unwatch(configFile)
+        flush_config()
+        dbg_log('oe::stop_service', f'settings lock: {settings_store.LOCK.stats()}', LOGINFO)
         xbmc.log('## CoreELEC Addon ## STOP SERVICE DONE !')
     except Exception as e:
         dbg_log('oe::stop_service', f'ERROR: ({repr(e)})')
@@ -736,14 +765,15 @@ def openReleaseNotes():
     global winOeMain, __cwd__, __oe__
     try:
         CLdialog = xbmcgui.Dialog()
-        CLdialog.textviewer(RNOTES_TITLE, RNOTES, 1)
+        CLdialog.textviewer(*release_notes(), 1)
     except Exception as e:
         dbg_log('oe::openChangeLog', 'ERROR: (' + repr(e) + ')')
 
 
 def openConfigurationWindow():
-    global winOeMain, __cwd__, __oe__, dictModules, PIN
+    global winOeMain, __cwd__, __oe__, dictModules
     try:
+        PIN = pin_storage()
         match = True
 
         if PIN.isEnabled():
@@ -753,11 +783,11 @@ def openConfigurationWindow():
                 timeleft = PIN.delayRemaining()
                 timeleft_mins, timeleft_secs = divmod(timeleft, 60)
                 timeleft_hours, timeleft_mins = divmod(timeleft_mins, 60)
-                xbmcDialog.ok(_(32237), _(32238) % (timeleft_mins, timeleft_secs))
+                dialog().ok(_(32237), _(32238) % (timeleft_mins, timeleft_secs))
                 return
 
             while PIN.attemptsRemaining() > 0:
-                lockcode = xbmcDialog.numeric(0, _(32233), bHiddenInput=True)
+                lockcode = dialog().numeric(0, _(32233), bHiddenInput=True)
                 if lockcode == '':
                     break
 
@@ -769,19 +799,24 @@ def openConfigurationWindow():
                 PIN.fail()
 
                 if PIN.attemptsRemaining() > 0:
-                    xbmcDialog.ok(_(32234), f'{PIN.attemptsRemaining()} {_(32235)}')
+                    dialog().ok(_(32234), f'{PIN.attemptsRemaining()} {_(32235)}')
 
             if not match and PIN.attemptsRemaining() <= 0:
-              xbmcDialog.ok(_(32234), _(32236))
+              dialog().ok(_(32234), _(32236))
               return
 
         if match == True:
-            winOeMain = oeWindows.mainWindow('service-CoreELEC-Settings-mainWindow.xml', __cwd__, 'Default', oeMain=__oe__)
-            winOeMain.doModal()
-            for strModule in dictModules:
-                dictModules[strModule].exit()
-            winOeMain = None
-            del winOeMain
+            prewarm.opening()
+            try:
+                winOeMain = oeWindows.mainWindow('service-CoreELEC-Settings-mainWindow.xml', __cwd__, 'Default', oeMain=__oe__)
+                winOeMain.doModal()
+                for strModule in dictModules:
+                    dictModules[strModule].exit()
+                # None, not del: a deleted global would be created again on
+                # the next oe.winOeMain through __getattr__
+                winOeMain = None
+            finally:
+                prewarm.closed()
 
     except Exception as e:
         dbg_log('oe::openConfigurationWindow', f'ERROR: ({repr(e)})')
@@ -796,138 +831,117 @@ def standby_devices():
 
 def load_config():
     try:
-        global conf_lock
-        while conf_lock:
-            time.sleep(0.2)
-        conf_lock = True
-        if os.path.exists(configFile):
-            config_file = open(configFile, 'r')
-            config_text = config_file.read()
-            config_file.close()
-        else:
-            config_text = ''
-        if config_text == '':
-            xml_conf = minidom.Document()
-            xml_main = xml_conf.createElement('coreelec')
-            xml_conf.appendChild(xml_main)
-            xml_sub = xml_conf.createElement('addon_config')
-            xml_main.appendChild(xml_sub)
-            xml_sub = xml_conf.createElement('settings')
-            xml_main.appendChild(xml_sub)
-            config_text = xml_conf.toprettyxml()
-        else:
-            xml_conf = minidom.parseString(config_text)
-        conf_lock = False
-        return xml_conf
+        with settings_store.LOCK.read():
+            return settings_store.load(configFile)
     except Exception as e:
         dbg_log('oe::load_config', f'ERROR: ({repr(e)})')
 
 
-def save_config(xml_conf):
+def save_config(xml_conf, change=None):
     try:
-        global configFile, conf_lock
-        while conf_lock:
-            time.sleep(0.2)
-        conf_lock = True
-        config_file = open(configFile, 'w')
-        config_file.write(xml_conf.toprettyxml())
-        config_file.close()
-        conf_lock = False
+        with settings_store.LOCK.write():
+            settings_store.save(configFile, xml_conf, change)
     except Exception as e:
         dbg_log('oe::save_config', f'ERROR: ({repr(e)})')
 
 
+def subscribe(module, setting, callback):
+    try:
+        return settings_store.subscribe(configFile, module, setting, callback)
+    except Exception as e:
+        dbg_log('oe::subscribe', f'ERROR: ({repr(e)})')
+
+
+def unsubscribe(module, setting, callback):
+    try:
+        settings_store.unsubscribe(configFile, module, setting, callback)
+    except Exception as e:
+        dbg_log('oe::unsubscribe', f'ERROR: ({repr(e)})')
+
+
+def settings_transaction():
+    return settings_store.transaction(configFile)
+
+
+def flush_config():
+    try:
+        settings_store.flush(configFile)
+    except Exception as e:
+        dbg_log('oe::flush_config', f'ERROR: ({repr(e)})')
+
+
 def read_module(module):
     try:
-        xml_conf = load_config()
-        xml_settings = xml_conf.getElementsByTagName('settings')
-        for xml_setting in xml_settings:
-            for xml_modul in xml_setting.getElementsByTagName(module):
-                return xml_modul
+        with settings_store.LOCK.read():
+            return settings_store.get_module(load_config(), module)
     except Exception as e:
         dbg_log('oe::read_module', f'ERROR: ({repr(e)})')
 
 
 def read_node(node_name):
     try:
-        xml_conf = load_config()
-        xml_node = xml_conf.getElementsByTagName(node_name)
-        value = {}
-        for xml_main_node in xml_node:
-            value[xml_main_node.nodeName] = {}
-            for xml_sub_node in xml_main_node.childNodes:
-                if len(xml_sub_node.childNodes) == 0:
-                    continue
-                value[xml_main_node.nodeName][xml_sub_node.nodeName] = {}
-                for xml_value in xml_sub_node.childNodes:
-                    if hasattr(xml_value.firstChild, 'nodeValue'):
-                        value[xml_main_node.nodeName][xml_sub_node.nodeName][xml_value.nodeName] = xml_value.firstChild.nodeValue
-                    else:
-                        value[xml_main_node.nodeName][xml_sub_node.nodeName][xml_value.nodeName] = ''
-        return value
+        with settings_store.LOCK.read():
+            value = {}
+            for xml_main_node in settings_store.get_nodes(load_config(), node_name):
+                value[node_name] = {}
+                for sub_node, xml_sub_node in xml_main_node.items():
+                    if not xml_sub_node:
+                        continue
+                    value[node_name][sub_node] = {}
+                    if isinstance(xml_sub_node, str):
+                        continue
+                    for name, xml_value in xml_sub_node.items():
+                        value[node_name][sub_node][name] = xml_value if isinstance(xml_value, str) else ''
+            return value
     except Exception as e:
         dbg_log('oe::read_node', f'ERROR: ({repr(e)})')
 
 
 def remove_node(node_name):
     try:
-        xml_conf = load_config()
-        xml_node = xml_conf.getElementsByTagName(node_name)
-        for xml_main_node in xml_node:
-            xml_main_node.parentNode.removeChild(xml_main_node)
-        save_config(xml_conf)
+        with settings_store.LOCK.write():
+            xml_conf = load_config()
+            change = ('remove', node_name)
+            settings_store.apply(xml_conf, change)
+            save_config(xml_conf, change)
+        settings_store.notify(configFile)
     except Exception as e:
+        settings_store.invalidate(configFile)
         dbg_log('oe::remove_node', f'ERROR: ({repr(e)})')
 
 
 def read_setting(module, setting, default=None):
     try:
-        xml_conf = load_config()
-        xml_settings = xml_conf.getElementsByTagName('settings')
-        value = default
-        for xml_setting in xml_settings:
-            for xml_modul in xml_setting.getElementsByTagName(module):
-                for xml_modul_setting in xml_modul.getElementsByTagName(setting):
-                    if hasattr(xml_modul_setting.firstChild, 'nodeValue'):
-                        value = xml_modul_setting.firstChild.nodeValue
-        return value
+        with settings_store.LOCK.read():
+            return settings_store.get_value(load_config(), module, setting, default)
     except Exception as e:
         dbg_log('oe::read_setting', f'ERROR: ({repr(e)})')
 
 
+def read_settings(module):
+    try:
+        with settings_store.LOCK.read():
+            return settings_store.get_values(load_config(), module)
+    except Exception as e:
+        dbg_log('oe::read_settings', f'ERROR: ({repr(e)})')
+        return {}
+
+
 def write_setting(module, setting, value, main_node='settings'):
+    write_settings(module, {setting: value}, main_node)
+
+
+def write_settings(module, values, main_node='settings'):
     try:
-        xml_conf = load_config()
-        xml_settings = xml_conf.getElementsByTagName(main_node)
-        if len(xml_settings) == 0:
-            for xml_main in xml_conf.getElementsByTagName('coreelec'):
-                xml_sub = xml_conf.createElement(main_node)
-                xml_main.appendChild(xml_sub)
-                xml_settings = xml_conf.getElementsByTagName(main_node)
-        module_found = 0
-        setting_found = 0
-        for xml_setting in xml_settings:
-            for xml_modul in xml_setting.getElementsByTagName(module):
-                module_found = 1
-                for xml_modul_setting in xml_modul.getElementsByTagName(setting):
-                    setting_found = 1
-        if setting_found == 1:
-            if hasattr(xml_modul_setting.firstChild, 'nodeValue'):
-                xml_modul_setting.firstChild.nodeValue = value
-            else:
-                xml_value = xml_conf.createTextNode(value)
-                xml_modul_setting.appendChild(xml_value)
-        else:
-            if module_found == 0:
-                xml_modul = xml_conf.createElement(module)
-                xml_setting.appendChild(xml_modul)
-            xml_setting = xml_conf.createElement(setting)
-            xml_modul.appendChild(xml_setting)
-            xml_value = xml_conf.createTextNode(value)
-            xml_setting.appendChild(xml_value)
-        save_config(xml_conf)
+        with settings_store.LOCK.write():
+            xml_conf = load_config()
+            change = ('set', module, values, main_node)
+            settings_store.apply(xml_conf, change)
+            save_config(xml_conf, change)
+        settings_store.notify(configFile)
     except Exception as e:
-        dbg_log('oe::write_setting', f'ERROR: ({repr(e)})')
+        settings_store.invalidate(configFile)
+        dbg_log('oe::write_settings', f'ERROR: ({repr(e)})')
 
 
 def load_modules():
@@ -947,7 +961,9 @@ def load_modules():
         for module_name in dict_names:
             try:
                 if not module_name in dictModules:
+                    started = time.monotonic()
                     dictModules[module_name] = getattr(__import__(module_name), module_name)(__oe__)
+                    metrics.MODULE_LOAD_SECONDS.set(time.monotonic() - started, module=module_name)
                     if hasattr(defaults, module_name):
                         for key in getattr(defaults, module_name):
                             setattr(dictModules[module_name], key, getattr(defaults, module_name)[key])
@@ -977,12 +993,12 @@ def reboot_counter(seconds=10, title=' '):
     reboot_dlg.create(f'CoreELEC {title}', ' ')
     reboot_dlg.update(0)
     wait_time = seconds
-    while seconds >= 0 and not (reboot_dlg.iscanceled() or xbmcm.abortRequested()):
+    while seconds >= 0 and not (reboot_dlg.iscanceled() or monitor().abortRequested()):
         progress = round(1.0 * seconds / wait_time * 100)
         reboot_dlg.update(int(progress), _(32329) % seconds)
-        xbmcm.waitForAbort(1)
+        monitor().waitForAbort(1)
         seconds = seconds - 1
-    if reboot_dlg.iscanceled() or xbmcm.abortRequested():
+    if reboot_dlg.iscanceled() or monitor().abortRequested():
         return 0
     else:
         return 1
@@ -999,47 +1015,8 @@ def exit():
     del _
 
 
-# fix for xml printout
-
-def fixed_writexml(self, writer, indent='', addindent='', newl=''):
-    writer.write(f'{indent}<{self.tagName}')
-    attrs = self._get_attributes()
-    a_names = list(attrs.keys())
-    a_names.sort()
-    for a_name in a_names:
-        writer.write(f' {a_name}="')
-        minidom._write_data(writer, attrs[a_name].value)
-        writer.write('"')
-    if self.childNodes:
-        if len(self.childNodes) == 1 and self.childNodes[0].nodeType == minidom.Node.TEXT_NODE:
-            writer.write('>')
-            self.childNodes[0].writexml(writer, '', '', '')
-            writer.write(f'</{self.tagName}>{newl}')
-            return
-        writer.write(f'>{newl}')
-        for node in self.childNodes:
-            if node.nodeType is not minidom.Node.TEXT_NODE:
-                node.writexml(writer, indent + addindent, addindent, newl)
-        writer.write(f'{indent}</{self.tagName}>{newl}')
-    else:
-        writer.write(f'/>{newl}')
-
-
 def parse_os_release():
-    os_release_fields = re.compile(r'(?!#)(?P<key>.+)=(?P<quote>[\'\"]?)(?P<value>.+)(?P=quote)$')
-    os_release_unescape = re.compile(r'\\(?P<escaped>[\'\"\\])')
-    try:
-        with open('/etc/os-release') as f:
-            info = {}
-            for line in f:
-                m = re.match(os_release_fields, line)
-                if m is not None:
-                    key = m.group('key')
-                    value = re.sub(os_release_unescape, r'\g<escaped>', m.group('value'))
-                    info[key] = value
-            return info
-    except OSError:
-        return None
+    return os_tools.read_os_release()
 
 
 def get_os_release():
@@ -1079,60 +1056,98 @@ def get_os_release():
             last_stable
             )
 
-minidom.Element.writexml = fixed_writexml
-
 ############################################################################################
 # Base Environment
 ############################################################################################
 
-os_release_data = get_os_release()
-DISTRIBUTION = os_release_data[0]
-VERSION_ID = os_release_data[1]
-VERSION = os_release_data[2]
-ARCHITECTURE = os_release_data[3]
-BUILD = os_release_data[4]
-PROJECT = os_release_data[5]
-DEVICE = os_release_data[6]
-BUILDER_NAME = os_release_data[7]
-BUILDER_VERSION = os_release_data[8]
-LAST_STABLE = os_release_data[9]
 DOWNLOAD_DIR = '/storage/downloads'
 XBMC_USER_HOME = os.environ.get('XBMC_USER_HOME', '/storage/.kodi')
 CONFIG_CACHE = os.environ.get('CONFIG_CACHE', '/storage/.cache')
 USER_CONFIG = os.environ.get('USER_CONFIG', '/storage/.config')
 TEMP = f'{XBMC_USER_HOME}/temp/'
-winOeMain = oeWindows.mainWindow('service-CoreELEC-Settings-mainWindow.xml', __cwd__, 'Default', oeMain=__oe__)
-if os.path.exists('/etc/machine-id'):
-    SYSTEMID = load_file('/etc/machine-id')
-else:
-    SYSTEMID = os.environ.get('SYSTEMID', '')
-
-if PROJECT == 'RPi':
-  RPI_CPU_VER = execute('vcgencmd otp_dump 2>/dev/null | grep 30: | cut -c8', get_result=1).replace('\n','')
-else:
-  RPI_CPU_VER = ''
 
 configini = '/flash/config.ini'
 dtbxml = '/flash/dtb.xml'
 dtbxml_default = '/usr/share/bootloader/dtb.xml'
 dtb_tree = None
 dtb_root = None
-BOOT_STATUS = load_file('/storage/.config/boot.status')
-BOOT_HINT = load_file('/storage/.config/boot.hint')
-
-RNOTES = load_file('/etc/release-notes')
-RNOTES_TITLE = 'Release Notes: CoreELEC %s' % VERSION
-
-HAS_RNOTES = 1
-if RNOTES == '':
-  HAS_RNOTES = 0
-else:
-  #TODO: fix so this can be done in a way that doesn't leave blank line
-  regex = '\[TITLE\](.*?)\[\/TITLE\]'
-  match = re.search(regex, RNOTES, re.IGNORECASE)
-  if match:
-    RNOTES_TITLE = match.group(1)
-    RNOTES = re.sub(regex, "", RNOTES)
+
+
+def system_id():
+    if os.path.exists('/etc/machine-id'):
+        return load_file('/etc/machine-id')
+    return os.environ.get('SYSTEMID', '')
+
+
+def rpi_cpu_ver():
+    if get_os_release()[5] == 'RPi':
+        return execute('vcgencmd otp_dump 2>/dev/null | grep 30: | cut -c8', get_result=1).replace('\n','')
+    return ''
+
+
+@functools.lru_cache(maxsize=None)
+def release_notes():
+    # (title, text), the text is empty if there are none
+    rnotes = load_file('/etc/release-notes')
+    rnotes_title = 'Release Notes: CoreELEC %s' % get_os_release()[2]
+    #TODO: fix so this can be done in a way that doesn't leave blank line
+    regex = '\[TITLE\](.*?)\[\/TITLE\]'
+    match = re.search(regex, rnotes, re.IGNORECASE)
+    if match:
+        rnotes_title = match.group(1)
+        rnotes = re.sub(regex, "", rnotes)
+    return rnotes_title, rnotes
+
+
+# module globals that are computed on first use instead of at import
+_LAZY = {
+    'DISTRIBUTION': lambda: get_os_release()[0],
+    'VERSION_ID': lambda: get_os_release()[1],
+    'VERSION': lambda: get_os_release()[2],
+    'ARCHITECTURE': lambda: get_os_release()[3],
+    'BUILD': lambda: get_os_release()[4],
+    'PROJECT': lambda: get_os_release()[5],
+    'DEVICE': lambda: get_os_release()[6],
+    'BUILDER_NAME': lambda: get_os_release()[7],
+    'BUILDER_VERSION': lambda: get_os_release()[8],
+    'LAST_STABLE': lambda: get_os_release()[9],
+    'SYSTEMID': system_id,
+    'RPI_CPU_VER': rpi_cpu_ver,
+    'BOOT_STATUS': lambda: load_file('/storage/.config/boot.status'),
+    'BOOT_HINT': lambda: load_file('/storage/.config/boot.hint'),
+    'RNOTES': lambda: release_notes()[1],
+    'RNOTES_TITLE': lambda: release_notes()[0],
+    'HAS_RNOTES': lambda: 1 if release_notes()[1] else 0,
+    'xbmcDialog': xbmcgui.Dialog,
+    'xbmcm': xbmc.Monitor,
+    'winOeMain': lambda: oeWindows.mainWindow('service-CoreELEC-Settings-mainWindow.xml', __cwd__, 'Default', oeMain=__oe__),
+    'PIN': PINStorage,
+    }
+_lazy_lock = threading.RLock()
+
+
+def __getattr__(name):
+    # only called for names that are not (yet) module globals, the value
+    # then becomes a plain global and later lookups do not come here again
+    if name not in _LAZY:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    with _lazy_lock:
+        if name not in globals():
+            globals()[name] = _LAZY[name]()
+        return globals()[name]
+
+
+def dialog():
+    return __getattr__('xbmcDialog')
+
+
+def monitor():
+    return __getattr__('xbmcm')
+
+
+def pin_storage():
+    return __getattr__('PIN')
+
 
 ############################################################################################
 
@@ -1156,4 +1171,5 @@ try:
 except:
     pass
 
-PIN = PINStorage()
+if os.path.exists(f'{USER_CONFIG}/settings-journal'):
+    settings_store.enable_journal(configFile)
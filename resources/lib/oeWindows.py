@@ -5,6 +5,8 @@
 # Copyright (C) 2020-present Team CoreELEC (https://coreelec.org)
 
 import oe
+import prewarm
+import watchdog
 import xbmc
 import xbmcgui
 import xbmcaddon
@@ -12,7 +14,6 @@ import os
 import time
 import re
 from xml.dom import minidom
-from threading import Thread
 
 xbmcDialog = xbmcgui.Dialog()
 
@@ -62,6 +63,7 @@ class mainWindow(xbmcgui.WindowXMLDialog):
             self.isChild = True
         pass
 
+    @watchdog.handler('ui')
     def onInit(self):
         self.visible = True
         try:
@@ -77,21 +79,19 @@ class mainWindow(xbmcgui.WindowXMLDialog):
             for strModule in sorted(oe.dictModules, key=lambda x: list(oe.dictModules[x].menu.keys())):
                 module = oe.dictModules[strModule]
                 oe.dbg_log('init module', strModule, oe.LOGDEBUG)
-                if module.ENABLED:
-                    if hasattr(module, 'do_init'):
-                        Thread(target=module.do_init(), args=()).start()
-                    for men in module.menu:
-                        if 'listTyp' in module.menu[men] and 'menuLoader' in module.menu[men]:
-                            dictProperties = {
-                                'modul': strModule,
-                                'listTyp': oe.listObject[module.menu[men]['listTyp']],
-                                'menuLoader': module.menu[men]['menuLoader'],
-                                }
-                            if 'InfoText' in module.menu[men]:
-                                dictProperties['InfoText'] = oe._(module.menu[men]['InfoText'])
-                            self.addMenuItem(module.menu[men]['name'], dictProperties)
+                if module.ENABLED and hasattr(module, 'do_init'):
+                    module.do_init()
+            # the menu model is prebuilt and translated by the service
+            lstItems = []
+            for strName, dictProperties in prewarm.menu():
+                lstItem = xbmcgui.ListItem(label=strName)
+                for strProp in dictProperties:
+                    lstItem.setProperty(strProp, str(dictProperties[strProp]))
+                lstItems.append(lstItem)
+            self.getControl(self.guiMenList).addItems(lstItems)
             self.setFocusId(self.guiMenList)
             self.onFocus(self.guiMenList)
+            prewarm.first_frame()
         except Exception as e:
             oe.dbg_log('oeWindows.mainWindow::onInit', f'ERROR: ({repr(e)})')
 
@@ -184,6 +184,7 @@ class mainWindow(xbmcgui.WindowXMLDialog):
         except Exception as e:
             oe.dbg_log(f'oeWindows.mainWindow::showButton({str(number)}, {str(action)})', f'ERROR: ({repr(e)})')
 
+    @watchdog.handler('ui')
     def onAction(self, action):
         try:
             focusId = self.getFocusId()
@@ -226,6 +227,7 @@ class mainWindow(xbmcgui.WindowXMLDialog):
             if actionId in oe.CANCEL:
                 self.close()
 
+    @watchdog.handler('ui')
     def onClick(self, controlID):
         oe.dbg_log('oeWindows::onClick', 'enter_function', oe.LOGDEBUG)
         try:
@@ -340,6 +342,7 @@ class mainWindow(xbmcgui.WindowXMLDialog):
     def onUnload(self):
         pass
 
+    @watchdog.handler('ui')
     def onFocus(self, controlID):
         try:
             if controlID in self.guiLists:
@@ -464,6 +467,7 @@ class wizard(xbmcgui.WindowXMLDialog):
         self.wizards = []
         self.last_wizard = None
 
+    @watchdog.handler('ui')
     def onInit(self):
         self.visible = True
         try:
@@ -622,6 +626,7 @@ class wizard(xbmcgui.WindowXMLDialog):
     def onAction(self, action):
         pass
 
+    @watchdog.handler('ui')
     def onClick(self, controlID):
         global strModule
         global prevModule
@@ -643,12 +648,14 @@ class wizard(xbmcgui.WindowXMLDialog):
                         return
             if controlID == 1501:
                 self.wizards.remove(strModule)
-                oe.remove_node(strModule)
+                with oe.settings_transaction():
+                    oe.remove_node(strModule)
+                    if strModule != "system":
+                        self.wizards.remove(prevModule)
+                        oe.remove_node(prevModule)
                 if strModule == "system":
                     self.onInit()
                 else:
-                    self.wizards.remove(prevModule)
-                    oe.remove_node(prevModule)
                     self.onClick(1500)
                 oe.dbg_log(f'wizard::onClick({str(controlID)})', 'exit_function', oe.LOGDEBUG)
 
@@ -702,6 +709,7 @@ class wizard(xbmcgui.WindowXMLDialog):
         except Exception as e:
             oe.dbg_log('oeWindows.wizard::onClick()', f'ERROR: ({repr(e)})')
 
+    @watchdog.handler('ui')
     def onFocus(self, controlID):
         pass
 
@@ -1,7 +1,9 @@
 # SPDX-License-Identifier: GPL-2.0
 # Copyright (C) 2020-present Team LibreELEC
 
+import functools
 import os
+import re
 
 def read_shell_setting(file, default):
     setting = default
@@ -21,3 +23,22 @@ def read_shell_settings(file, defaults={}):
                     value = value[1:-1]
                 settings[name] = value
     return settings
+
+
+@functools.lru_cache(maxsize=None)
+def read_os_release(file='/etc/os-release'):
+    # parsed once, callers must not modify the result
+    os_release_fields = re.compile(r'(?!#)(?P<key>.+)=(?P<quote>[\'\"]?)(?P<value>.+)(?P=quote)$')
+    os_release_unescape = re.compile(r'\\(?P<escaped>[\'\"\\])')
+    try:
+        with open(file) as f:
+            info = {}
+            for line in f:
+                m = re.match(os_release_fields, line)
+                if m is not None:
+                    key = m.group('key')
+                    value = re.sub(os_release_unescape, r'\g<escaped>', m.group('value'))
+                    info[key] = value
+            return info
+    except OSError:
+        return None
@@ -0,0 +1,230 @@
+# SPDX-License-Identifier: GPL-2.0-or-later
+# Copyright (C) 2020-present Team CoreELEC (https://coreelec.org)
+
+# Keeps what the settings window shows ready before it is opened: the
+# values of the modules (load_values, done by their start_service) and the
+# main menu with its labels translated. A module whose settings change is
+# reloaded in the background, so opening the window only binds the model
+# to the controls. Changes while the window is open are picked up after it
+# is closed, the window keeps its own values meanwhile. Values kept in
+# other files are marked stale by whatever writes them (invalidate).
+
+import log
+import metrics
+import oe
+import threading
+import time
+import xbmc
+
+REFRESH_DELAY = 1.0
+
+# not reloaded in the background: hardware reads sysfs and config.ini and
+# its do_init loads them on open; updates fetches the update JSON over the
+# network and its own handlers keep its values current
+NOT_RELOADED = ('hardware', 'updates')
+
+# settings of other modules that load_values reads
+DEPENDS = {
+    'services': (('bluetooth', 'idle_timeout'),),
+    }
+
+# the menu labels are translated depending on these
+MENU_DEPENDS = (('system', 'language'), ('coreelec', 'wizard_completed'))
+
+# _lock is never held while a module loads its values, a load holds the
+# lock of its module so a do_init waits for one that is running
+_lock = threading.RLock()
+_module_locks = {}
+_started = False
+_menu = None
+_menu_key = None
+_stale = set()
+_subscriptions = []
+_timer = None
+_opened = None
+_first_frame = False
+
+
+def _language():
+    return (oe.read_setting('system', 'language'), oe.read_setting('coreelec', 'wizard_completed'), xbmc.getLanguage())
+
+
+def _build_menu():
+    global _menu_key
+    _menu_key = _language()
+    menu = []
+    for strModule in sorted(oe.dictModules, key=lambda x: list(oe.dictModules[x].menu.keys())):
+        module = oe.dictModules[strModule]
+        if not module.ENABLED:
+            continue
+        for men in module.menu:
+            if 'listTyp' in module.menu[men] and 'menuLoader' in module.menu[men]:
+                dictProperties = {
+                    'modul': strModule,
+                    'listTyp': oe.listObject[module.menu[men]['listTyp']],
+                    'menuLoader': module.menu[men]['menuLoader'],
+                    }
+                if 'InfoText' in module.menu[men]:
+                    dictProperties['InfoText'] = oe._(module.menu[men]['InfoText'])
+                menu.append((oe._(module.menu[men]['name']), dictProperties))
+    return menu
+
+
+def _changed(module, setting, value):
+    invalidate(module)
+
+
+def _dependency_changed(module, setting, value):
+    with _lock:
+        for name, settings in DEPENDS.items():
+            if (module, setting) in settings:
+                _stale.add(name)
+        if _opened is None:
+            _schedule()
+
+
+def _language_changed(module, setting, value):
+    global _menu
+    with _lock:
+        _menu = None
+        if _opened is None:
+            _schedule()
+
+
+def _schedule():
+    # called with _lock held, a burst of changes is reloaded once
+    global _timer
+    if _timer is not None:
+        _timer.cancel()
+    _timer = threading.Timer(REFRESH_DELAY, refresh)
+    _timer.daemon = True
+    _timer.start()
+
+
+def _module_lock(name):
+    with _lock:
+        return _module_locks.setdefault(name, threading.Lock())
+
+
+def _load(name):
+    # called with the lock of the module held; a change during the load
+    # marks the module stale again
+    with _lock:
+        _stale.discard(name)
+    module = oe.dictModules.get(name)
+    if module is not None and hasattr(module, 'load_values'):
+        started = time.monotonic()
+        module.load_values()
+        metrics.PREWARM_LOADS.observe(time.monotonic() - started, module=name)
+
+
+def _subscribe(module, setting, callback):
+    oe.subscribe(module, setting, callback)
+    _subscriptions.append((module, setting, callback))
+
+
+@log.log_function(log.INFO)
+def start():
+    # after oe.start_service, which loaded the values of every module
+    global _started, _menu
+    with _lock:
+        for name, module in oe.dictModules.items():
+            if not module.ENABLED or not hasattr(module, 'load_values') or name in NOT_RELOADED:
+                continue
+            for category in getattr(module, 'struct', {}).values():
+                for setting in category.get('settings', {}):
+                    _subscribe(name, setting, _changed)
+            for depends in DEPENDS.get(name, ()):
+                _subscribe(*depends, _dependency_changed)
+        for module, setting in MENU_DEPENDS:
+            _subscribe(module, setting, _language_changed)
+        _menu = _build_menu()
+        _started = True
+
+
+@log.log_function(log.INFO)
+def stop():
+    global _started, _timer
+    with _lock:
+        if _timer is not None:
+            _timer.cancel()
+            _timer = None
+        for module, setting, callback in _subscriptions:
+            oe.unsubscribe(module, setting, callback)
+        _subscriptions.clear()
+        _started = False
+
+
+@log.log_function()
+def refresh():
+    global _menu, _timer
+    with _lock:
+        _timer = None
+        if _opened is not None:
+            return
+        names = sorted(_stale)
+    for name in names:
+        with _module_lock(name):
+            with _lock:
+                # once the window is open its do_init loads what is stale
+                if _opened is not None or name not in _stale:
+                    continue
+            _load(name)
+    with _lock:
+        if _opened is None:
+            _menu = _build_menu()
+
+
+def invalidate(name):
+    # for values that do not come from oe_settings.xml, before start the
+    # window loads everything anyway
+    with _lock:
+        if not _started:
+            return
+        _stale.add(name)
+        if _opened is None:
+            _schedule()
+
+
+def ensure_values(name):
+    # for do_init: reload only what changed since it was prewarmed
+    with _module_lock(name):
+        with _lock:
+            load = not _started or name in _stale
+        if load:
+            _load(name)
+
+
+def menu():
+    global _menu
+    with _lock:
+        if _menu is None or _menu_key != _language():
+            _menu = _build_menu()
+        return _menu
+
+
+def opening():
+    global _opened, _first_frame
+    with _lock:
+        _opened = time.monotonic()
+        _first_frame = True
+
+
+def first_frame():
+    # onInit runs again when a child window closes, only the first counts
+    global _first_frame
+    with _lock:
+        if _opened is None or not _first_frame:
+            return
+        _first_frame = False
+        elapsed = time.monotonic() - _opened
+    metrics.WINDOW_FIRST_FRAME.observe(elapsed)
+    log.log(f'settings window ready after {elapsed * 1000:.0f} ms', log.INFO)
+
+
+def closed():
+    global _opened
+    with _lock:
+        _opened = None
+        if _started:
+            _schedule()
@@ -0,0 +1,117 @@
+# SPDX-License-Identifier: GPL-2.0-or-later
+# Copyright (C) 2020-present Team CoreELEC (https://coreelec.org)
+
+import log
+import os
+import sys
+import threading
+import time
+import wakeups
+
+TEMP = os.path.join(os.environ.get('XBMC_USER_HOME', '/storage/.kodi'), 'temp')
+
+INTERVAL = 0.01
+MAX_OVERHEAD = 0.02
+DURATION = 300
+MAX_DEPTH = 64
+
+_profiler = None
+_profiler_lock = threading.Lock()
+
+
+class Profiler(threading.Thread):
+
+    # samples the stacks of all threads and counts them in collapsed stack
+    # format (flamegraph.pl, speedscope). The time spent sampling is kept
+    # below max_overhead of the wall time by stretching the interval.
+
+    def __init__(self, interval=INTERVAL, max_overhead=MAX_OVERHEAD, duration=DURATION):
+        super().__init__(name='profiler', daemon=True)
+        self.interval = interval
+        self.max_overhead = max_overhead
+        self.duration = duration
+        self.stacks = {}
+        self.samples = 0
+        self.sampling = 0.0
+        self.started = None
+        self.stopped = threading.Event()
+
+    def sample(self):
+        threads = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == self.ident:
+                continue
+            names = []
+            while frame is not None and len(names) < MAX_DEPTH:
+                code = frame.f_code
+                names.append(f'{code.co_name} ({os.path.basename(code.co_filename)})')
+                frame = frame.f_back
+            names.append(threads.get(ident, str(ident)).replace(' ', '_'))
+            stack = ';'.join(reversed(names))
+            self.stacks[stack] = self.stacks.get(stack, 0) + 1
+        self.samples += 1
+
+    def run(self):
+        self.started = time.monotonic()
+        delay = self.interval
+        source = wakeups.register('profiler')
+        while not self.stopped.wait(delay):
+            source.tick()
+            begin = time.monotonic()
+            self.sample()
+            cost = time.monotonic() - begin
+            self.sampling += cost
+            delay = max(self.interval, cost / self.max_overhead - cost)
+            if self.duration and begin - self.started >= self.duration:
+                break
+
+    def stop(self):
+        self.stopped.set()
+        if self.is_alive():
+            self.join()
+
+    def write(self, path=None):
+        path = path or os.path.join(TEMP, f'service.coreelec.settings.{time.strftime("%Y%m%d-%H%M%S")}.collapsed')
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as output:
+            for stack, count in sorted(self.stacks.items()):
+                output.write(f'{stack} {count}\n')
+        return path
+
+    def stats(self):
+        elapsed = time.monotonic() - self.started if self.started else 0
+        return {
+            'samples': self.samples,
+            'stacks': len(self.stacks),
+            'elapsed': elapsed,
+            'overhead': self.sampling / elapsed if elapsed else 0,
+        }
+
+
+def start(interval=INTERVAL, max_overhead=MAX_OVERHEAD, duration=DURATION):
+    global _profiler
+    with _profiler_lock:
+        if _profiler is not None and _profiler.is_alive():
+            return False
+        _profiler = Profiler(interval, max_overhead, duration)
+        _profiler.start()
+    log.log(f'profiler started, interval {interval}s, max overhead {max_overhead}, duration {duration}s', log.INFO)
+    return True
+
+
+def stop(path=None):
+    # also collects a profile that already ended after its duration
+    global _profiler
+    with _profiler_lock:
+        profiler, _profiler = _profiler, None
+    if profiler is None:
+        return None
+    profiler.stop()
+    path = profiler.write(path)
+    log.log(f'profiler stopped, {profiler.stats()}, written to {path}', log.INFO)
+    return path
+
+
+def running():
+    profiler = _profiler
+    return profiler is not None and profiler.is_alive()
@@ -0,0 +1,118 @@
+# SPDX-License-Identifier: GPL-2.0-or-later
+# Copyright (C) 2020-present Team CoreELEC (https://coreelec.org)
+
+# JSON-RPC methods of the control socket, see control.py and cli.py
+
+import control
+import dbus_bluez
+import dbus_connman
+import oe
+import settings_store
+
+# module.action: methods of the settings modules that run without a list
+# item or a dialog and apply the values the module already holds
+ACTIONS = {
+    'bluetooth': ('start_discovery', 'stop_discovery'),
+    'connman': ('set_timeservers', 'set_technologie', 'set_network_wait', 'init_netfilter'),
+    'services': ('initialize_samba', 'initialize_ssh', 'initialize_avahi', 'initialize_cron', 'initialize_bluetooth', 'initialize_obex'),
+    'system': ('set_hw_clock',),
+    'updates': ('get_channels', 'get_hardware_flags'),
+}
+
+
+def settings_get(module, settings=None):
+    values = oe.read_settings(module)
+    if settings is None:
+        return values
+    return {setting: values.get(setting) for setting in settings}
+
+
+def settings_list(module=None):
+    with settings_store.LOCK.read():
+        xml_conf = oe.load_config()
+        if module is None:
+            modules = [name for xml_settings in settings_store.get_nodes(xml_conf, 'settings') for name in xml_settings]
+        else:
+            modules = [module]
+        return {name: settings_store.get_values(xml_conf, name) for name in modules}
+
+
+def _check(txn):
+    # oe logs and swallows write errors, the transaction is then rolled back
+    if txn.failed:
+        raise IOError('settings were not written, see the log')
+
+
+def settings_set(values):
+    # {module: {setting: value}}, written in one transaction. This only
+    # stores the values, the set_* handlers of the modules are not called:
+    # a value takes effect when its module next reads it, or through
+    # module.action
+    if not isinstance(values, dict) or not all(isinstance(settings, dict) for settings in values.values()):
+        raise control.InvalidParams('values must be {module: {setting: value}}')
+    for module, settings in values.items():
+        for name in (module, *settings):
+            if not settings_store.valid_name(name):
+                raise control.InvalidParams(f'{name!r} is not a valid setting name')
+    written = 0
+    with oe.settings_transaction() as txn:
+        for module, settings in values.items():
+            settings = {setting: str(value) for setting, value in settings.items()}
+            oe.write_settings(module, settings)
+            written += len(settings)
+    _check(txn)
+    return written
+
+
+def settings_remove(node):
+    with oe.settings_transaction() as txn:
+        oe.remove_node(node)
+    _check(txn)
+    return True
+
+
+def service_get(service, options=()):
+    return {
+        'state': oe.get_service_state(service),
+        'options': {option: oe.get_service_option(service, option) for option in options},
+    }
+
+
+def service_set(service, options, state):
+    oe.set_service(service, options, int(state))
+    return True
+
+
+def config_ini_set(var, value="''"):
+    oe.set_config_ini(var, value)
+    return True
+
+
+def module_action(module, action):
+    if action not in ACTIONS.get(module, ()):
+        raise ValueError(f'{module}.{action} is not an action')
+    return getattr(oe.dictModules[module], action)()
+
+
+METHODS = {
+    'settings.get': settings_get,
+    'settings.list': settings_list,
+    'settings.set': settings_set,
+    'settings.remove': settings_remove,
+    'service.get': service_get,
+    'service.set': service_set,
+    'config_ini.set': config_ini_set,
+    'module.action': module_action,
+    'connman.properties': dbus_connman.manager_get_properties,
+    'connman.services': dbus_connman.manager_get_services,
+    'connman.technologies': dbus_connman.manager_get_technologies,
+    'connman.service': dbus_connman.service_get_properties,
+    'bluetooth.adapter': dbus_bluez.find_adapter,
+    'bluetooth.devices': dbus_bluez.find_devices,
+    'methods': control.methods,
+}
+
+
+def register():
+    for method, handler in METHODS.items():
+        control.register_method(method, handler)
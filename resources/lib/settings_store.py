@@ -0,0 +1,891 @@
+# SPDX-License-Identifier: GPL-2.0-or-later
+# Copyright (C) 2020-present Team CoreELEC (https://coreelec.org)
+
+import contextlib
+import ctypes
+import fcntl
+import json
+import log
+import metrics
+import os
+import re
+import select
+import stat
+import struct
+import tempfile
+import threading
+import time
+import wakeups
+from xml.etree import ElementTree
+
+
+class RWLock(object):
+
+    # Many readers or one writer. Waiting writers block new readers so a
+    # stream of reads cannot starve them. Both kinds are reentrant and the
+    # writer may also take the read side; upgrading a read lock is refused
+    # because two readers upgrading would deadlock each other.
+
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = {}
+        self._writer = None
+        self._writer_count = 0
+        self._writers_waiting = 0
+        self._stats = {
+            'read': {'acquired': 0, 'contended': 0, 'wait': 0.0, 'max_wait': 0.0},
+            'write': {'acquired': 0, 'contended': 0, 'wait': 0.0, 'max_wait': 0.0},
+            }
+
+    def _record(self, kind, started):
+        stats = self._stats[kind]
+        stats['acquired'] += 1
+        if started is not None:
+            wait = time.monotonic() - started
+            stats['contended'] += 1
+            stats['wait'] += wait
+            stats['max_wait'] = max(stats['max_wait'], wait)
+
+    def acquire_read(self):
+        me = threading.get_ident()
+        with self._cond:
+            if self._writer == me or me in self._readers:
+                self._readers[me] = self._readers.get(me, 0) + 1
+                return
+            started = None
+            while self._writer is not None or self._writers_waiting:
+                if started is None:
+                    started = time.monotonic()
+                self._cond.wait()
+            self._readers[me] = 1
+            self._record('read', started)
+
+    def release_read(self):
+        me = threading.get_ident()
+        with self._cond:
+            if self._readers[me] == 1:
+                del self._readers[me]
+                self._cond.notify_all()
+            else:
+                self._readers[me] -= 1
+
+    def acquire_write(self):
+        me = threading.get_ident()
+        with self._cond:
+            if self._writer == me:
+                self._writer_count += 1
+                return
+            if me in self._readers:
+                raise RuntimeError('cannot upgrade a read lock to a write lock')
+            started = None
+            self._writers_waiting += 1
+            try:
+                while self._writer is not None or self._readers:
+                    if started is None:
+                        started = time.monotonic()
+                    self._cond.wait()
+            finally:
+                self._writers_waiting -= 1
+            self._writer = me
+            self._writer_count = 1
+            self._record('write', started)
+
+    def release_write(self):
+        with self._cond:
+            self._writer_count -= 1
+            if self._writer_count == 0:
+                self._writer = None
+                self._cond.notify_all()
+
+    @contextlib.contextmanager
+    def read(self):
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release_read()
+
+    @contextlib.contextmanager
+    def write(self):
+        self.acquire_write()
+        try:
+            yield
+        finally:
+            self.release_write()
+
+    def stats(self):
+        with self._cond:
+            return {kind: dict(values) for kind, values in self._stats.items()}
+
+    def reset_stats(self):
+        with self._cond:
+            for values in self._stats.values():
+                values.update(acquired=0, contended=0, wait=0.0, max_wait=0.0)
+
+
+class FileLock(object):
+
+    # flock() based lock on <path>.lock shared with other processes (the
+    # addon entry points, other addons, scripts editing the settings). The
+    # lock file also holds a generation counter bumped on every write, so a
+    # process can tell whether its cached document is current with one
+    # pread() instead of parsing the file again. flock() locks belong to the
+    # open file and not to a thread, so threads take turns through a mutex;
+    # nested use in the thread holding it keeps the outer lock.
+
+    def __init__(self, path):
+        self.path = f'{path}.lock'
+        self.fd = None
+        self.mutex = threading.RLock()
+        self.depth = 0
+
+    def open(self):
+        if self.fd is None:
+            try:
+                self.fd = os.open(self.path, os.O_RDWR | os.O_CREAT | os.O_CLOEXEC, 0o644)
+            except OSError:
+                pass
+        return self.fd
+
+    def generation(self):
+        fd = self.open()
+        if fd is None:
+            return 0
+        try:
+            return int(os.pread(fd, 20, 0) or b'0')
+        except (OSError, ValueError):
+            return 0
+
+    def bump(self):
+        fd = self.open()
+        if fd is not None:
+            os.pwrite(fd, b'%020d' % (self.generation() + 1), 0)
+
+    @contextlib.contextmanager
+    def locked(self, exclusive=False):
+        with self.mutex:
+            fd = self.open() if self.depth == 0 else None
+            if fd is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            self.depth += 1
+            try:
+                yield
+            finally:
+                self.depth -= 1
+                if fd is not None:
+                    fcntl.flock(fd, fcntl.LOCK_UN)
+
+
+# quiet period before pending changes are written, and the longest a change
+# may stay pending while writes keep coming in
+WRITE_DELAY = 1.0
+WRITE_MAX_DELAY = 5.0
+
+# with a journal every change is durable once appended, so the document is
+# only compacted back into the XML file after a longer quiet period, or as
+# soon as the journal grows past JOURNAL_MAX_SIZE bytes
+JOURNAL_DELAY = 60.0
+JOURNAL_MAX_DELAY = 600.0
+JOURNAL_MAX_SIZE = 65536
+
+# path -> (signature, document)
+_cache = {}
+# path -> document not yet written to disk
+_pending = {}
+# path -> changes in the pending document, None when they are not known
+_changes = {}
+# path -> FileLock
+_file_locks = {}
+# path -> (threading.Timer, time of the first pending change)
+_timers = {}
+# path -> journal path
+_journals = {}
+# path -> {(module, setting): [last value, callbacks]}
+_subscriptions = {}
+_notify_lock = threading.RLock()
+# path -> Watcher
+_watchers = {}
+# per thread: path -> Transaction
+_transactions = threading.local()
+# lock order: LOCK, _write_lock, _cache_lock
+LOCK = RWLock()
+_cache_lock = threading.Lock()
+_write_lock = threading.Lock()
+
+
+def file_lock(path):
+    with _cache_lock:
+        if path not in _file_locks:
+            _file_locks[path] = FileLock(path)
+        return _file_locks[path]
+
+
+def signature(path):
+    # the stat data catches editors that do not know about the generation
+    # counter, the counter catches writes within the mtime granularity
+    generation = file_lock(path).generation()
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return (None, generation)
+    return (st.st_mtime_ns, st.st_ino, st.st_size, generation)
+
+
+# The settings document is kept as nested dicts instead of a DOM: an element
+# with child elements is a dict of tag -> child in document order, an element
+# holding only text is its str and an empty element is an empty dict. This is
+# all the addon ever stores, and serialize() writes it back byte for byte the
+# way toprettyxml() did.
+
+
+class _DocumentBuilder(object):
+
+    def __init__(self):
+        self.nodes = [{}]
+        self.texts = [[]]
+        self.merged = set()
+
+    def start(self, tag, attrib):
+        self.nodes.append({})
+        self.texts.append([])
+
+    def data(self, data):
+        self.texts[-1].append(data)
+
+    def end(self, tag):
+        node = self.nodes.pop()
+        text = ''.join(self.texts.pop())
+        # text around child elements is only the pretty print indentation
+        value = node if node or text == '' else text
+        parent = self.nodes[-1]
+        if tag in parent:
+            # a repeated element, e.g. a module section twice in a file
+            # edited by hand: merged, the last value of a setting wins as
+            # it did for minidom reads
+            self.merged.add(tag)
+            if isinstance(parent[tag], dict) and isinstance(value, dict):
+                _merge(parent[tag], value)
+                return
+        parent[tag] = value
+
+    def close(self):
+        return self.nodes[0]
+
+
+def _merge(into, node):
+    for tag, child in node.items():
+        if isinstance(into.get(tag), dict) and isinstance(child, dict):
+            _merge(into[tag], child)
+        else:
+            into[tag] = child
+
+
+def parse_text(chunks):
+    builder = _DocumentBuilder()
+    parser = ElementTree.XMLParser(target=builder)
+    empty = True
+    for chunk in chunks:
+        if chunk:
+            empty = False
+            parser.feed(chunk)
+    if empty:
+        return new_document()
+    xml_conf = parser.close()
+    if builder.merged:
+        log.log(f'merged repeated elements {sorted(builder.merged)}, they are written back once', log.WARNING)
+    return xml_conf
+
+
+def _escape(text):
+    # same entities as minidom writes
+    if '&' in text:
+        text = text.replace('&', '&amp;')
+    if '<' in text:
+        text = text.replace('<', '&lt;')
+    if '"' in text:
+        text = text.replace('"', '&quot;')
+    if '>' in text:
+        text = text.replace('>', '&gt;')
+    return text
+
+
+def _serialize(parts, tag, node, indent):
+    if isinstance(node, str):
+        parts.append(f'{indent}<{tag}>{_escape(node)}</{tag}>\n')
+    elif node:
+        parts.append(f'{indent}<{tag}>\n')
+        child_indent = f'{indent}\t'
+        for child_tag, child in node.items():
+            _serialize(parts, child_tag, child, child_indent)
+        parts.append(f'{indent}</{tag}>\n')
+    else:
+        parts.append(f'{indent}<{tag}/>\n')
+
+
+def serialize(xml_conf):
+    parts = ['<?xml version="1.0" ?>\n']
+    for tag, node in xml_conf.items():
+        _serialize(parts, tag, node, '')
+    return ''.join(parts)
+
+
+def copy_document(node):
+    return {tag: copy_document(child) if isinstance(child, dict) else child
+            for tag, child in node.items()}
+
+
+def new_document():
+    return {'coreelec': {'addon_config': {}, 'settings': {}}}
+
+
+def _main_node(xml_conf, main_node, create=False):
+    for xml_main in xml_conf.values():
+        if not isinstance(xml_main, dict):
+            continue
+        xml_settings = xml_main.get(main_node)
+        if isinstance(xml_settings, dict):
+            return xml_settings
+        if create:
+            xml_settings = xml_main[main_node] = {}
+            return xml_settings
+    return None
+
+
+# module and setting names are element names, anything else would make the
+# file unreadable: letters, digits, _ . - and not starting with a digit,
+# . or -
+_name = re.compile(r'[^\W\d][\w.-]*')
+
+
+def valid_name(name):
+    return isinstance(name, str) and _name.fullmatch(name) is not None
+
+
+def set_values(xml_conf, module, values, main_node='settings'):
+    for name in (main_node, module, *values):
+        if not valid_name(name):
+            raise ValueError(f'{name!r} is not a valid setting name')
+    xml_settings = _main_node(xml_conf, main_node, create=True)
+    if xml_settings is None:
+        return
+    xml_modul = xml_settings.get(module)
+    if not isinstance(xml_modul, dict):
+        xml_modul = xml_settings[module] = {}
+    xml_modul.update(values)
+
+
+def _text(value):
+    # '' is written as an empty element, which parses as {}: both read as ''
+    if value == {}:
+        return ''
+    return value if isinstance(value, str) else None
+
+
+def get_value(xml_conf, module, setting, default=None):
+    xml_modul = get_module(xml_conf, module)
+    if xml_modul is not None:
+        value = _text(xml_modul.get(setting))
+        if value is not None:
+            return value
+    return default
+
+
+def get_values(xml_conf, module):
+    xml_modul = get_module(xml_conf, module)
+    if xml_modul is None:
+        return {}
+    values = {setting: _text(value) for setting, value in xml_modul.items()}
+    return {setting: value for setting, value in values.items() if value is not None}
+
+
+def get_module(xml_conf, module):
+    xml_settings = _main_node(xml_conf, 'settings')
+    if xml_settings is not None:
+        xml_modul = xml_settings.get(module)
+        if isinstance(xml_modul, dict):
+            return xml_modul
+    return None
+
+
+def get_nodes(xml_conf, node_name):
+    # all elements named node_name anywhere in the document
+    found = []
+    for tag, child in xml_conf.items():
+        if not isinstance(child, dict):
+            continue
+        if tag == node_name:
+            found.append(child)
+        found.extend(get_nodes(child, node_name))
+    return found
+
+
+def remove_nodes(xml_conf, node_name):
+    for tag in list(xml_conf):
+        if tag == node_name:
+            del xml_conf[tag]
+        elif isinstance(xml_conf[tag], dict):
+            remove_nodes(xml_conf[tag], node_name)
+
+
+def apply(xml_conf, change):
+    # changes are absolute, replaying one that is already part of the
+    # document leaves it as it is
+    if change[0] == 'set':
+        set_values(xml_conf, *change[1:])
+    elif change[0] == 'remove':
+        remove_nodes(xml_conf, *change[1:])
+    else:
+        raise ValueError(f'unknown settings change {change[0]!r}')
+
+
+def enable_journal(path, journal_path=None):
+    with _cache_lock:
+        _journals[path] = journal_path or f'{path}.journal'
+        _cache.pop(path, None)
+
+
+def read_journal(journal_path):
+    changes = []
+    try:
+        with open(journal_path, 'rb') as journal:
+            good = 0
+            for line in journal:
+                try:
+                    if not line.endswith(b'\n'):
+                        raise ValueError
+                    changes.append(json.loads(line))
+                except ValueError:
+                    # torn last record after a power loss, cut it off so new
+                    # records are not appended behind it
+                    os.truncate(journal_path, good)
+                    break
+                good += len(line)
+    except FileNotFoundError:
+        pass
+    return changes
+
+
+def append_journal(journal_path, *changes):
+    with open(journal_path, 'a') as journal:
+        journal.write(''.join(json.dumps(change, separators=(',', ':')) + '\n' for change in changes))
+        journal.flush()
+        os.fsync(journal.fileno())
+        return journal.tell()
+
+
+def _transaction(path):
+    return getattr(_transactions, 'active', {}).get(path)
+
+
+def parse(path):
+    # the XML file with the journal replayed on top, under the shared lock so
+    # a compaction in another process cannot run in between
+    with file_lock(path).locked():
+        current = signature(path)
+        if current[0] is None:
+            xml_conf = new_document()
+        else:
+            with open(path, 'rb') as config_file:
+                xml_conf = parse_text(iter(lambda: config_file.read(65536), b''))
+        journal_path = _journals.get(path)
+        changes = read_journal(journal_path) if journal_path else []
+        for change in changes:
+            apply(xml_conf, change)
+    return current, xml_conf, changes
+
+
+def load(path):
+    txn = _transaction(path)
+    if txn is not None:
+        metrics.SETTINGS_LOADS.inc(source='transaction')
+        return txn.xml_conf
+    current = signature(path)
+    with _cache_lock:
+        if path in _pending:
+            metrics.SETTINGS_LOADS.inc(source='pending')
+            return _pending[path]
+        cached = _cache.get(path)
+        if cached is not None and cached[0] == current:
+            metrics.SETTINGS_LOADS.inc(source='cache')
+            return cached[1]
+    metrics.SETTINGS_LOADS.inc(source='disk')
+    current, xml_conf, changes = parse(path)
+    with _cache_lock:
+        _cache[path] = (current, xml_conf)
+    if changes:
+        # fold the replayed journal back into the XML file
+        save(path, xml_conf)
+    return xml_conf
+
+
+def _set_pending(path, xml_conf, changes):
+    # called with _cache_lock held
+    _pending[path] = xml_conf
+    if changes is None or _changes.get(path, []) is None:
+        _changes[path] = None
+    else:
+        _changes.setdefault(path, []).extend(changes)
+
+
+def save(path, xml_conf, change=None, delay=None):
+    txn = _transaction(path)
+    if txn is not None:
+        txn.changes.append(change)
+        return
+    metrics.SETTINGS_SAVES.inc()
+    journal_path = _journals.get(path)
+    compact = False
+    if journal_path is not None:
+        if change is not None:
+            compact = _append(path, journal_path, xml_conf, change) >= JOURNAL_MAX_SIZE
+        if delay is None:
+            delay = JOURNAL_DELAY
+        max_delay = JOURNAL_MAX_DELAY
+    else:
+        if delay is None:
+            delay = WRITE_DELAY
+        max_delay = WRITE_MAX_DELAY
+    with _cache_lock:
+        _set_pending(path, xml_conf, None if change is None else [change])
+        timer, first = _timers.pop(path, (None, time.monotonic()))
+        if timer is not None:
+            timer.cancel()
+        if compact or (delay > 0 and time.monotonic() - first < max_delay):
+            timer = threading.Timer(0 if compact else delay, _flush_later, args=(path,))
+            timer.daemon = True
+            _timers[path] = (timer, first)
+            timer.start()
+            return
+    flush(path)
+
+
+def _append(path, journal_path, xml_conf, *changes):
+    lock = file_lock(path)
+    with lock.locked(exclusive=True):
+        before = signature(path)
+        size = append_journal(journal_path, *changes)
+        metrics.SETTINGS_JOURNAL_APPENDS.inc(len(changes))
+        lock.bump()
+        after = signature(path)
+        with _cache_lock:
+            cached = _cache.get(path)
+            if cached is not None and cached[0] == before:
+                # nobody else wrote in between, the document with the
+                # changes applied is current
+                _cache[path] = (after, xml_conf)
+    return size
+
+
+def flush(path=None):
+    # documents are only modified under the write side of LOCK, which also
+    # keeps new journal records out until the journal has been truncated.
+    # A document stays in _pending until its write has updated _cache, so
+    # loads in between never fall back to an older cached document, and
+    # stays there if its write fails.
+    with LOCK.read(), _write_lock:
+        with _cache_lock:
+            paths = list(_pending) if path is None else [path]
+            pending = {}
+            for name in paths:
+                timer, first = _timers.pop(name, (None, None))
+                if timer is not None:
+                    timer.cancel()
+                if name in _pending:
+                    pending[name] = (_pending[name], _changes.get(name))
+        error = None
+        for name, (xml_conf, changes) in pending.items():
+            try:
+                _write_pending(name, xml_conf, changes)
+            except Exception as e:
+                # the others are still written, the first error is raised
+                if error is None:
+                    error = e
+                else:
+                    log.log(f'{name}: {repr(e)}', log.ERROR)
+        if error is not None:
+            raise error
+
+
+def _write_pending(path, pending, changes):
+    xml_conf = pending
+    lock = file_lock(path)
+    journal_path = _journals.get(path)
+    with lock.locked(exclusive=True):
+        with _cache_lock:
+            base = _cache.get(path, (None, None))[0]
+        if signature(path) != base:
+            # written by another process since we loaded it: start from what
+            # is on disk and redo our changes instead of overwriting theirs.
+            # The journal already holds ours.
+            if journal_path is not None:
+                _, xml_conf, _ = parse(path)
+            elif changes is not None:
+                _, xml_conf, _ = parse(path)
+                for change in changes:
+                    apply(xml_conf, change)
+            else:
+                log.log(f'{path} changed on disk, overwriting it', log.WARNING)
+        with metrics.SETTINGS_WRITES.time():
+            write(path, serialize(xml_conf))
+        if journal_path is not None and os.path.exists(journal_path):
+            os.truncate(journal_path, 0)
+        lock.bump()
+        current = signature(path)
+        with _cache_lock:
+            _cache[path] = (current, xml_conf)
+            if _pending.get(path) is pending:
+                _pending.pop(path)
+                _changes.pop(path, None)
+    return xml_conf
+
+
+def _flush_later(path):
+    try:
+        flush(path)
+    except Exception as e:
+        log.log(f'{path}: {repr(e)}', log.ERROR)
+
+
+def write(path, text):
+    # write-to-temp + fsync + rename, so the file is either the old or the
+    # new version even if power is lost in between
+    directory = os.path.dirname(path) or '.'
+    fd, temp_path = tempfile.mkstemp(
+        prefix=f'.{os.path.basename(path)}.', dir=directory)
+    try:
+        with os.fdopen(fd, 'w') as temp_file:
+            temp_file.write(text)
+            temp_file.flush()
+            os.fsync(temp_file.fileno())
+        try:
+            os.chmod(temp_path, stat.S_IMODE(os.stat(path).st_mode))
+        except FileNotFoundError:
+            os.chmod(temp_path, 0o644)
+        os.replace(temp_path, path)
+    except:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    dir_fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
+
+
+def invalidate(path=None):
+    # pending documents are kept, they are what the file will contain next.
+    # Inside a transaction the working copy may be half modified, so the
+    # transaction is rolled back instead of committed.
+    for name, txn in getattr(_transactions, 'active', {}).items():
+        if path is None or name == path:
+            txn.failed = True
+    with _cache_lock:
+        if path is None:
+            _cache.clear()
+        else:
+            _cache.pop(path, None)
+
+
+class Transaction(object):
+
+    def __init__(self, path, xml_conf):
+        self.path = path
+        self.xml_conf = xml_conf
+        self.changes = []
+        self.failed = False
+
+
+@contextlib.contextmanager
+def transaction(path):
+    # Changes made inside the block go to a private copy of the document that
+    # loads in this thread see. On success the copy replaces the document and
+    # is written once (or its changes appended to the journal with a single
+    # fsync); on an exception or a failed write the copy is thrown away.
+    # Nested transactions join the outer one. Yields the Transaction, whose
+    # failed is set once the block is rolled back.
+    txn = _transaction(path)
+    if txn is not None:
+        yield txn
+        return
+    with LOCK.write():
+        txn = Transaction(path, copy_document(load(path)))
+        active = getattr(_transactions, 'active', None)
+        if active is None:
+            active = _transactions.active = {}
+        active[path] = txn
+        try:
+            yield txn
+        finally:
+            del active[path]
+        if txn.failed:
+            log.log(f'{path}: transaction rolled back', log.WARNING)
+            return
+        if txn.changes:
+            _commit(txn)
+    notify(path)
+
+
+def _commit(txn):
+    journal_path = _journals.get(txn.path)
+    if journal_path is not None and None not in txn.changes:
+        _append(txn.path, journal_path, txn.xml_conf, *txn.changes)
+        save(txn.path, txn.xml_conf)
+        return
+    with _cache_lock:
+        previous = (_pending.get(txn.path), _changes.get(txn.path, []))
+        _set_pending(txn.path, txn.xml_conf, None if None in txn.changes else txn.changes)
+    try:
+        flush(txn.path)
+    except:
+        with _cache_lock:
+            if previous[0] is None:
+                _pending.pop(txn.path, None)
+                _changes.pop(txn.path, None)
+            else:
+                _pending[txn.path], _changes[txn.path] = previous
+        raise
+
+
+def subscribe(path, module, setting, callback):
+    with _notify_lock:
+        subscriptions = _subscriptions.setdefault(path, {})
+        if (module, setting) not in subscriptions:
+            with LOCK.read():
+                value = get_value(load(path), module, setting)
+            subscriptions[(module, setting)] = [value, []]
+        subscriptions[(module, setting)][1].append(callback)
+        return subscriptions[(module, setting)][0]
+
+
+def unsubscribe(path, module, setting, callback):
+    with _notify_lock:
+        subscription = _subscriptions.get(path, {}).get((module, setting))
+        if subscription is not None and callback in subscription[1]:
+            subscription[1].remove(callback)
+            if not subscription[1]:
+                del _subscriptions[path][(module, setting)]
+
+
+def notify(path):
+    # Compare the subscribed settings with the values last reported and call
+    # back for the ones that changed. Called after a write has released the
+    # lock, and by the watcher when the file changed underneath us.
+    if _transaction(path) is not None:
+        return
+    with _notify_lock:
+        subscriptions = _subscriptions.get(path)
+        if not subscriptions:
+            return
+        changed = []
+        with LOCK.read():
+            xml_conf = load(path)
+            for (module, setting), subscription in subscriptions.items():
+                value = get_value(xml_conf, module, setting)
+                if value != subscription[0]:
+                    subscription[0] = value
+                    changed.append((module, setting, value, list(subscription[1])))
+    for module, setting, value, callbacks in changed:
+        for callback in callbacks:
+            try:
+                callback(module, setting, value)
+            except Exception as e:
+                log.log(f'{module}/{setting}: {repr(e)}', log.ERROR)
+
+
+class Watcher(threading.Thread):
+
+    # Calls notify() when the settings file is replaced or rewritten by
+    # someone else. Uses inotify on the directory (the file itself is
+    # replaced by rename) and falls back to checking the file signature every
+    # POLL_INTERVAL seconds where inotify is not available.
+
+    POLL_INTERVAL = 10.0
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_NONBLOCK = 0o4000
+    IN_CLOEXEC = 0o2000000
+
+    def __init__(self, path):
+        super().__init__(daemon=True)
+        self.path = path
+        self.name = f'settings watcher {os.path.basename(path)}'
+        self.stop_read, self.stop_write = os.pipe()
+        self.inotify = self.init_inotify()
+
+    def init_inotify(self):
+        try:
+            libc = ctypes.CDLL(None, use_errno=True)
+            fd = libc.inotify_init1(self.IN_NONBLOCK | self.IN_CLOEXEC)
+            if fd < 0:
+                return None
+            mask = self.IN_CLOSE_WRITE | self.IN_MOVED_TO | self.IN_CREATE
+            directory = os.path.dirname(self.path) or '.'
+            if libc.inotify_add_watch(fd, directory.encode(), mask) < 0:
+                os.close(fd)
+                return None
+            return fd
+        except (AttributeError, OSError):
+            return None
+
+    def events(self):
+        # names of the files touched since the last call
+        names = set()
+        try:
+            data = os.read(self.inotify, 65536)
+        except BlockingIOError:
+            return names
+        offset = 0
+        while offset + 16 <= len(data):
+            _, _, _, length = struct.unpack_from('iIII', data, offset)
+            names.add(data[offset + 16:offset + 16 + length].rstrip(b'\0').decode(errors='replace'))
+            offset += 16 + length
+        return names
+
+    def run(self):
+        basenames = (os.path.basename(self.path), f'{os.path.basename(self.path)}.journal')
+        last = signature(self.path)
+        source = wakeups.register(f'settings watcher {os.path.basename(self.path)}')
+        while True:
+            fds = [self.stop_read]
+            if self.inotify is not None:
+                fds.append(self.inotify)
+            ready, _, _ = select.select(fds, [], [],
+                None if self.inotify is not None else self.POLL_INTERVAL)
+            source.tick()
+            if self.stop_read in ready:
+                break
+            if self.inotify is not None and not self.events().intersection(basenames):
+                continue
+            current = signature(self.path)
+            if current == last:
+                continue
+            last = current
+            try:
+                notify(self.path)
+            except Exception as e:
+                log.log(f'{self.path}: {repr(e)}', log.ERROR)
+        if self.inotify is not None:
+            os.close(self.inotify)
+        os.close(self.stop_read)
+        os.close(self.stop_write)
+
+    def stop(self):
+        os.write(self.stop_write, b'\0')
+        self.join()
+
+
+def watch(path):
+    with _notify_lock:
+        if path not in _watchers:
+            _watchers[path] = Watcher(path)
+            _watchers[path].start()
+
+
+def unwatch(path=None):
+    with _notify_lock:
+        paths = list(_watchers) if path is None else [path]
+        watchers = [_watchers.pop(name) for name in paths if name in _watchers]
+    for watcher in watchers:
+        watcher.stop()
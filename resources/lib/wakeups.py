@@ -0,0 +1,69 @@
+# SPDX-License-Identifier: GPL-2.0-or-later
+# Copyright (C) 2020-present Team CoreELEC (https://coreelec.org)
+
+import threading
+import time
+
+_sources = {}
+_sources_lock = threading.Lock()
+
+
+class Source(object):
+
+    # a periodic loop calls tick() every time it wakes up; the CPU its
+    # thread used since the previous tick is charged to that wakeup
+
+    def __init__(self, name):
+        self.name = name
+        self.reset()
+
+    def reset(self):
+        self.wakeups = 0
+        self.cpu = 0.0
+        self.since = time.monotonic()
+        self.thread = None
+        self.last = None
+
+    def tick(self):
+        now = time.thread_time()
+        ident = threading.get_ident()
+        if self.thread == ident:
+            self.cpu += now - self.last
+        self.thread = ident
+        self.last = now
+        self.wakeups += 1
+
+
+def register(name):
+    with _sources_lock:
+        source = _sources.get(name)
+        if source is None:
+            source = _sources[name] = Source(name)
+        return source
+
+
+def stats():
+    now = time.monotonic()
+    with _sources_lock:
+        sources = list(_sources.values())
+    return {source.name: {
+        'wakeups': source.wakeups,
+        'per_minute': source.wakeups * 60 / max(now - source.since, 1e-9),
+        'cpu': source.cpu,
+    } for source in sources}
+
+
+def reset():
+    with _sources_lock:
+        for source in _sources.values():
+            source.reset()
+
+
+def report():
+    # noisiest first
+    lines = [f'{"source":32} {"wakeups":>8} {"per min":>8} {"cpu ms":>9} {"us/wakeup":>10}']
+    ranked = sorted(stats().items(), key=lambda item: (item[1]['per_minute'], item[1]['cpu']), reverse=True)
+    for name, source in ranked:
+        per_wakeup = source['cpu'] / source['wakeups'] * 1e6 if source['wakeups'] else 0
+        lines.append(f'{name:32} {source["wakeups"]:8} {source["per_minute"]:8.1f} {source["cpu"] * 1000:9.1f} {per_wakeup:10.1f}')
+    return '\n'.join(lines)
@@ -0,0 +1,155 @@
+# SPDX-License-Identifier: GPL-2.0-or-later
+# Copyright (C) 2020-present Team CoreELEC (https://coreelec.org)
+
+import functools
+import itertools
+import log
+import os
+import sys
+import threading
+import time
+import traceback
+import wakeups
+
+# a loop or handler that does not respond for THRESHOLD seconds is stalled
+THRESHOLD = 1.0
+
+# the checks wake up twice per THRESHOLD, so the service only starts them
+# if SETTINGS_WATCHDOG is set, otherwise "watchdog start" does
+ENABLED = os.environ.get('SETTINGS_WATCHDOG', 'no') != 'no'
+
+_loops = {}
+_busy = {}
+_tokens = itertools.count()
+_stats = {}
+_stats_lock = threading.Lock()
+_watchdog = None
+_watchdog_lock = threading.Lock()
+
+
+def _count(source, elapsed):
+    with _stats_lock:
+        stats = _stats.setdefault(source, [0, 0.0, 0.0])
+        stats[0] += 1
+        stats[1] += elapsed
+        stats[2] = max(stats[2], elapsed)
+
+
+def stats():
+    with _stats_lock:
+        return {source: {'stalls': stalls, 'total': total, 'longest': longest}
+                for source, (stalls, total, longest) in _stats.items()}
+
+
+def reset_stats():
+    with _stats_lock:
+        _stats.clear()
+
+
+def _log_stack(source, name, ident, elapsed):
+    frame = sys._current_frames().get(ident)
+    stack = ''.join(traceback.format_stack(frame)) if frame is not None else 'thread is gone\n'
+    log.log(f'{source} {name} not responding for {elapsed * 1000:.0f} ms, thread {ident}:\n{stack}', log.WARNING)
+
+
+def handler(source):
+    # UI handlers report when they are entered and left, the watchdog logs
+    # the stack of one that takes longer than THRESHOLD while it is stuck
+    def _handler_1(function):
+        @functools.wraps(function)
+        def _handler_2(*args, **kwargs):
+            token = next(_tokens)
+            _busy[token] = [source, function.__qualname__, threading.get_ident(), time.monotonic(), False]
+            try:
+                return function(*args, **kwargs)
+            finally:
+                _, _, _, started, _ = _busy.pop(token)
+                elapsed = time.monotonic() - started
+                if elapsed >= THRESHOLD:
+                    _count(source, elapsed)
+        return _handler_2
+    return _handler_1
+
+
+def watch_loop(name, loop, thread):
+    # the watchdog posts a callback to the loop and expects it to run soon
+    _loops[name] = [loop, thread, None, False]
+
+
+def unwatch_loop(name):
+    _loops.pop(name, None)
+
+
+def _beat(name, sent):
+    state = _loops.get(name)
+    if state is None:
+        return
+    elapsed = time.monotonic() - sent
+    if elapsed >= THRESHOLD:
+        _count(name, elapsed)
+        if state[3]:
+            log.log(f'{name} responding again after {elapsed * 1000:.0f} ms', log.WARNING)
+    state[2] = None
+    state[3] = False
+
+
+class Watchdog(threading.Thread):
+
+    def __init__(self, threshold):
+        super().__init__(name='watchdog', daemon=True)
+        self.threshold = threshold
+        self.stopped = threading.Event()
+
+    def check(self):
+        now = time.monotonic()
+        for name, state in list(_loops.items()):
+            loop, thread, sent, reported = state
+            if sent is None:
+                try:
+                    state[2] = now
+                    loop.call_soon_threadsafe(_beat, name, now)
+                except RuntimeError:
+                    # loop closed
+                    unwatch_loop(name)
+            elif not reported and now - sent >= self.threshold:
+                state[3] = True
+                _log_stack(name, 'event loop', thread.ident, now - sent)
+        for busy in _busy.copy().values():
+            source, name, ident, started, reported = busy
+            if not reported and now - started >= self.threshold:
+                busy[4] = True
+                _log_stack(source, name, ident, now - started)
+
+    def run(self):
+        source = wakeups.register('watchdog')
+        while not self.stopped.wait(self.threshold / 2):
+            source.tick()
+            try:
+                self.check()
+            except Exception as e:
+                log.log(f'watchdog check failed: {repr(e)}', log.ERROR)
+
+    def stop(self):
+        self.stopped.set()
+        if self.is_alive():
+            self.join()
+
+
+def start(threshold=None):
+    global _watchdog, THRESHOLD
+    with _watchdog_lock:
+        if _watchdog is not None:
+            return False
+        if threshold is not None:
+            THRESHOLD = threshold
+        _watchdog = Watchdog(THRESHOLD)
+        _watchdog.start()
+    return True
+
+
+def stop():
+    global _watchdog
+    with _watchdog_lock:
+        watchdog, _watchdog = _watchdog, None
+    if watchdog is not None:
+        watchdog.stop()
@@ -5,91 +5,166 @@
 # Copyright (C) 2020-present Team CoreELEC (https://coreelec.org)
 
 import syspath
+import control
 import dbus_utils
 import oe
-import os
+import prewarm
 import log
+import memory
+import metrics
+import profiler
+import rpc
 import threading
-import socket
+import wakeups
+import watchdog
 import xbmc
 
 
-class Service_Thread(threading.Thread):
+def open_configuration_window():
+    winOeMain = vars(oe).get('winOeMain')
+    if winOeMain is None or winOeMain.visible != True:
+        threading.Thread(target=oe.openConfigurationWindow).start()
 
-    SOCKET = '/var/run/service.coreelec.settings.sock'
 
-    def __init__(self):
-        threading.Thread.__init__(self)
-        self.init()
+def dump_debug_log():
+    return log.dump_ring()
 
-    @log.log_function()
-    def init(self):
-        if os.path.exists(self.SOCKET):
-            os.remove(self.SOCKET)
-        self.daemon = True
-        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
-        self.sock.setblocking(1)
-        self.sock.bind(self.SOCKET)
-        self.sock.listen(1)
-        self.stopped = False
 
-    @log.log_function()
-    def run(self):
-        if oe.read_setting('coreelec', 'wizard_completed') == None:
-            threading.Thread(target=oe.openWizard).start()
-        elif oe.BOOT_HINT == 'UPDATE' and oe.HAS_RNOTES:
-            threading.Thread(target=oe.openReleaseNotes).start()
-        while self.stopped == False:
-            log.log(f'Waiting', log.INFO)
-            conn, addr = self.sock.accept()
-            message = (conn.recv(1024)).decode('utf-8')
-            conn.close()
-            log.log(f'Received {message}', log.INFO)
-            if message == 'openConfigurationWindow':
-                if not hasattr(oe, 'winOeMain'):
-                    threading.Thread(target=oe.openConfigurationWindow).start()
-                else:
-                    if oe.winOeMain.visible != True:
-                        threading.Thread(
-                            target=oe.openConfigurationWindow).start()
-            if message == 'exit':
-                self.stopped = True
+def profile(action='stop', *options):
+    # profile start [interval=seconds] [overhead=fraction] [duration=seconds]
+    # profile stop
+    options = dict(option.split('=', 1) for option in options)
+    if action == 'start':
+        return profiler.start(
+            float(options.get('interval', profiler.INTERVAL)),
+            float(options.get('overhead', profiler.MAX_OVERHEAD)),
+            float(options.get('duration', profiler.DURATION)))
+    elif action == 'stop':
+        return profiler.stop()
+    raise ValueError(f'unknown profile action {action}')
+
+
+def memory_diagnostics(action, *options):
+    # memory start [frames]
+    # memory snapshot <name>
+    # memory diff <old> <new> [top]
+    # memory stop
+    if action == 'start':
+        return memory.start(*(int(option) for option in options))
+    elif action == 'snapshot':
+        return memory.snapshot(*options)
+    elif action == 'diff':
+        return memory.diff(*options[:2], *(int(option) for option in options[2:]))
+    elif action == 'stop':
+        return memory.stop()
+    raise ValueError(f'unknown memory action {action}')
+
+
+def stall_watchdog(action, *options):
+    # watchdog start [threshold=ms]
+    # watchdog stats
+    # watchdog stop
+    options = dict(option.split('=', 1) for option in options)
+    if action == 'start':
+        threshold = options.get('threshold')
+        return watchdog.start(float(threshold) / 1000 if threshold else None)
+    elif action == 'stats':
+        return watchdog.stats()
+    elif action == 'stop':
+        return watchdog.stop()
+    raise ValueError(f'unknown watchdog action {action}')
 
-    @log.log_function()
-    def stop(self):
-        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
-        sock.connect(self.SOCKET)
-        sock.send(bytes('exit', 'utf-8'))
-        sock.close()
-        self.join()
-        self.sock.close()
+
+def function_timing(action='report'):
+    # timing start
+    # timing report
+    # timing stats
+    # timing reset
+    # timing stop
+    if action == 'start':
+        return log.enable_timing(True)
+    elif action == 'report':
+        return log.dump_timings()
+    elif action == 'stats':
+        return log.timings()
+    elif action == 'reset':
+        return log.reset_timings()
+    elif action == 'stop':
+        return log.enable_timing(False)
+    raise ValueError(f'unknown timing action {action}')
+
+
+def wakeup_report(action='report'):
+    # wakeups [report|reset]
+    if action == 'report':
+        return wakeups.report()
+    elif action == 'reset':
+        return wakeups.reset()
+    raise ValueError(f'unknown wakeups action {action}')
+
+
+def register_commands():
+    control.register('openConfigurationWindow', open_configuration_window)
+    control.register('dumpDebugLog', dump_debug_log)
+    control.register('profile', profile)
+    control.register('memory', memory_diagnostics)
+    control.register('watchdog', stall_watchdog)
+    control.register('timing', function_timing)
+    control.register('wakeups', wakeup_report)
+    control.register('metrics', metrics.exposition)
+    control.register('help', control.commands)
+    rpc.register()
 
 
 class Monitor(xbmc.Monitor):
 
+    def __init__(self):
+        super().__init__()
+        self.standby = None
+        self.idle_timeout = None
+
+    @log.log_function()
+    def on_setting_changed(self, module, setting, value):
+        setattr(self, setting, value)
+
     @log.log_function()
     def onScreensaverActivated(self):
-        if oe.read_setting('bluetooth', 'standby'):
+        if self.standby:
             threading.Thread(target=oe.standby_devices).start()
 
     @log.log_function()
     def onDPMSActivated(self):
-        if oe.read_setting('bluetooth', 'standby'):
+        if self.standby:
             threading.Thread(target=oe.standby_devices).start()
 
     @log.log_function()
     def run(self):
         dbus_utils.LOOP_THREAD.start()
+        watchdog.watch_loop('dbus loop', dbus_utils.LOOP, dbus_utils.LOOP_THREAD)
+        if watchdog.ENABLED:
+            watchdog.start()
         oe.load_modules()
         oe.start_service()
-        service_thread = Service_Thread()
-        service_thread.start()
+        threading.Thread(target=prewarm.start, name='prewarm').start()
+        self.standby = oe.subscribe('bluetooth', 'standby', self.on_setting_changed)
+        self.idle_timeout = oe.subscribe('bluetooth', 'idle_timeout', self.on_setting_changed)
+        register_commands()
+        control.start()
+        if metrics.PORT:
+            metrics.start_server(dbus_utils.LOOP)
+        if oe.read_setting('coreelec', 'wizard_completed') == None:
+            threading.Thread(target=oe.openWizard).start()
+        elif oe.BOOT_HINT == 'UPDATE' and oe.HAS_RNOTES:
+            threading.Thread(target=oe.openReleaseNotes).start()
+        source = wakeups.register('service monitor')
         while not self.abortRequested():
             if self.waitForAbort(60):
                 break
-            if not oe.read_setting('bluetooth', 'standby'):
+            source.tick()
+            log.refresh_level()
+            if not self.standby:
                 continue
-            timeout = oe.read_setting('bluetooth', 'idle_timeout')
+            timeout = self.idle_timeout
             if not timeout:
                 continue
             try:
@@ -101,12 +176,24 @@ class Monitor(xbmc.Monitor):
             if xbmc.getGlobalIdleTime() / 60 >= timeout:
                 log.log(f'Idle timeout reached', log.DEBUG)
                 oe.standby_devices()
-        if hasattr(oe, 'winOeMain') and hasattr(oe.winOeMain, 'visible'):
-            if oe.winOeMain.visible == True:
-                oe.winOeMain.close()
+        # vars(), a window that was never created need not be created now
+        winOeMain = vars(oe).get('winOeMain')
+        if hasattr(winOeMain, 'visible'):
+            if winOeMain.visible == True:
+                winOeMain.close()
+        oe.unsubscribe('bluetooth', 'standby', self.on_setting_changed)
+        oe.unsubscribe('bluetooth', 'idle_timeout', self.on_setting_changed)
+        # no more requests once oe.stop_service has flushed the settings
+        control.stop()
+        metrics.stop_server(dbus_utils.LOOP)
+        prewarm.stop()
         oe.stop_service()
-        service_thread.stop()
+        profiler.stop()
+        watchdog.stop()
+        log.log(f'stalls: {watchdog.stats()}', log.INFO)
+        log.log(f'wakeups:\n{wakeups.report()}', log.INFO)
         dbus_utils.LOOP_THREAD.stop()
+        log.stop()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# SPDX-License-Identifier: GPL-2.0-or-later
+# Copyright (C) 2020-present Team CoreELEC (https://coreelec.org)
+
+# Per call overhead of log.log_function() on a method called with a D-Bus
+# like property map, with the old always-format decorator for comparison.
+# Exits with 1 if a call filtered out by the level costs more than
+# FILTERED_BUDGET ns, i.e. if something is formatted before the check.
+# Runs without Kodi:
+#
+#   python3 tools/benchmark_log_function.py [calls]
+
+import os
+import pprint
+import sys
+import time
+import traceback
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'resources', 'lib'))
+
+import log
+
+# a ring append and a level check, with room for a slow box
+FILTERED_BUDGET = 5000
+
+
+def sink(message, level=log.DEBUG):
+    pass
+
+
+def legacy_log_function(level=log.DEBUG):
+    # log_function() before the effective level check and the bounded repr
+    def _log_function_1(function):
+        header = f'SETTINGS: {function.__qualname__} '
+        def _log_function_2(*args, **kwargs):
+            try:
+                sink(f'{header}-', level)
+                for arg in args:
+                    sink(f'{header}< {pprint.pformat(arg)}', level)
+                for key, value in kwargs.items():
+                    sink(f'{header}< {key}={pprint.pformat(value)}', level)
+                result = function(*args, **kwargs)
+                sink(f'{header}> {pprint.pformat(result)}', level)
+                return result
+            except Exception as e:
+                sink(f'{header}# {repr(e)}', log.ERROR)
+                sink(traceback.format_exc(), log.ERROR)
+        return _log_function_2
+    return _log_function_1
+
+
+class Agent(object):
+
+    def plain(self, path, properties):
+        return len(properties)
+
+    @legacy_log_function()
+    def legacy(self, path, properties):
+        return len(properties)
+
+    @log.log_function()
+    def decorated(self, path, properties):
+        return len(properties)
+
+
+def timed(function, calls, *args):
+    started = time.perf_counter_ns()
+    for _ in range(calls):
+        function(*args)
+    return (time.perf_counter_ns() - started) / calls
+
+
+def main():
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    log._log = sink
+    properties = {f'Property{index}': {'Name': f'value{index}', 'Flags': list(range(8))} for index in range(40)}
+    path = '/net/connman/service/wifi_0123456789ab_managed_psk'
+    agent = Agent()
+    baseline = timed(agent.plain, calls, path, properties)
+    print(f'{calls} calls, {len(properties)} properties per call')
+    print(f'undecorated            {baseline:10.0f} ns/call')
+    print(f'legacy log_function    {timed(agent.legacy, calls, path, properties) - baseline:10.0f} ns/call overhead')
+    log.refresh_level(log.DEBUG)
+    print(f'log_function, DEBUG    {timed(agent.decorated, calls, path, properties) - baseline:10.0f} ns/call overhead')
+    log.refresh_level(log.INFO)
+    filtered = timed(agent.decorated, calls, path, properties) - baseline
+    print(f'log_function, filtered {filtered:10.0f} ns/call overhead')
+    if filtered > FILTERED_BUDGET:
+        print(f'filtered calls cost more than {FILTERED_BUDGET} ns', file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# SPDX-License-Identifier: GPL-2.0-or-later
+# Copyright (C) 2020-present Team CoreELEC (https://coreelec.org)
+
+# Time `import oe` in fresh interpreters, also with the standard library
+# modules it needs already imported (as in the service), which leaves the
+# work oe itself does at import. Then time the first access of each value
+# oe computes on first use. Runs without Kodi, the xbmc modules are
+# replaced by the stubs of benchmark_settings.py, so Dialog, Monitor and
+# the window cost less here than on a box:
+#
+#   python3 tools/benchmark_oe_import.py [--runs N]
+
+import argparse
+import importlib
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+LAZY = (
+    'xbmcDialog',
+    'xbmcm',
+    'DISTRIBUTION',
+    'SYSTEMID',
+    'RPI_CPU_VER',
+    'BOOT_STATUS',
+    'BOOT_HINT',
+    'RNOTES',
+    'HAS_RNOTES',
+    'winOeMain',
+    'PIN',
+    )
+
+STDLIB = (
+    'asyncio',
+    'hashlib',
+    'inspect',
+    'json',
+    'shutil',
+    'subprocess',
+    'tarfile',
+    'urllib.request',
+    'xml.etree.ElementTree',
+    )
+
+
+def child(preload):
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import benchmark_settings
+    home = tempfile.mkdtemp()
+    for name in ('XBMC_USER_HOME', 'CONFIG_CACHE', 'USER_CONFIG'):
+        os.environ[name] = os.path.join(home, name.lower())
+        os.makedirs(os.environ[name], exist_ok=True)
+    benchmark_settings.install_stubs()
+    if preload:
+        for name in STDLIB:
+            importlib.import_module(name)
+    started = time.perf_counter()
+    import oe
+    result = {'import': time.perf_counter() - started}
+    for name in LAZY:
+        started = time.perf_counter()
+        getattr(oe, name)
+        result[name] = time.perf_counter() - started
+    print(json.dumps(result))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--child', choices=('cold', 'preload'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(args.child == 'preload')
+        return
+    for mode in ('cold', 'preload'):
+        runs = []
+        for run in range(args.runs):
+            output = subprocess.run([sys.executable, __file__, '--child', mode], check=True, capture_output=True, text=True).stdout
+            runs.append(json.loads(output.splitlines()[-1]))
+        imports = [run['import'] * 1000 for run in runs]
+        print(f'import oe, {mode:8} min {min(imports):8.2f} ms  median {statistics.median(imports):8.2f} ms  ({args.runs} runs)')
+    for name in LAZY:
+        print(f'  first {name:12} {statistics.median(run[name] for run in runs) * 1000:9.3f} ms')
+
+
+if __name__ == '__main__':
+    main()
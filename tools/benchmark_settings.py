@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+# SPDX-License-Identifier: GPL-2.0-or-later
+# Copyright (C) 2020-present Team CoreELEC (https://coreelec.org)
+
+# Benchmark and stress the oe settings API (load_config, read_setting,
+# write_setting, remove_node) on synthetic settings files of increasing
+# size, then run mixed multi-threaded workloads and check that no update
+# got lost. Runs without Kodi, the xbmc modules are replaced by stubs:
+#
+#   python3 tools/benchmark_settings.py [--ops N] [--threads N] [--sizes 8x16,32x32] [--journal]
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import types
+
+ADDON_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(os.path.join(ADDON_PATH, 'resources', 'lib'))
+sys.path.append(os.path.join(ADDON_PATH, 'resources', 'lib', 'modules'))
+
+
+class Stub(object):
+
+    # stands in for any xbmc class, function or constant the addon touches
+    # at import time
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def __call__(self, *args, **kwargs):
+        return Stub()
+
+    def __getattr__(self, name):
+        return Stub()
+
+    def __str__(self):
+        return ''
+
+    def __bool__(self):
+        return False
+
+
+class Addon(Stub):
+
+    def getAddonInfo(self, key):
+        return ADDON_PATH if key == 'path' else ''
+
+    def getLocalizedString(self, code):
+        return str(code)
+
+    def getSetting(self, key):
+        return ''
+
+
+class Monitor(Stub):
+
+    def abortRequested(self):
+        return False
+
+    def waitForAbort(self, timeout=None):
+        time.sleep(timeout or 0)
+        return False
+
+
+def install_stubs():
+    modules = {
+        'xbmc': {
+            'LOGDEBUG': 0, 'LOGINFO': 1, 'LOGWARNING': 2, 'LOGERROR': 3, 'LOGFATAL': 4, 'LOGNONE': 5,
+            'Monitor': Monitor,
+            'log': lambda msg, level=0: None,
+        },
+        'xbmcaddon': {'Addon': Addon},
+        'xbmcgui': {'WindowXML': Stub, 'WindowXMLDialog': Stub},
+        'xbmcvfs': {'translatePath': lambda path: path},
+    }
+    for name, attributes in modules.items():
+        module = types.ModuleType(name)
+        module.__dict__.update(attributes)
+        module.__getattr__ = lambda attribute: Stub
+        sys.modules[name] = module
+
+
+def import_oe(home, journal):
+    for name in ('XBMC_USER_HOME', 'CONFIG_CACHE', 'USER_CONFIG'):
+        os.environ[name] = os.path.join(home, name.lower())
+        os.makedirs(os.environ[name], exist_ok=True)
+    if journal:
+        open(os.path.join(os.environ['USER_CONFIG'], 'settings-journal'), 'w').close()
+    install_stubs()
+    import oe
+    return oe
+
+
+def use_config(oe, settings_store, path, journal):
+    settings_store.flush()
+    settings_store.invalidate()
+    oe.configFile = path
+    if journal:
+        settings_store.enable_journal(path)
+
+
+def populate(settings_store, path, modules, keys):
+    xml_conf = settings_store.new_document()
+    for module in range(modules):
+        settings_store.set_values(xml_conf, f'module{module}',
+            {f'key{key}': f'value{key}' for key in range(keys)})
+    settings_store.write(path, settings_store.serialize(xml_conf))
+
+
+def percentile(samples, fraction):
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))]
+
+
+def report(name, samples, elapsed):
+    samples.sort()
+    print(f'  {name:16} {len(samples) / elapsed:10.0f} ops/s'
+          f'  p50 {percentile(samples, 0.50) / 1000:9.1f} us'
+          f'  p95 {percentile(samples, 0.95) / 1000:9.1f} us'
+          f'  p99 {percentile(samples, 0.99) / 1000:9.1f} us')
+
+
+def measure(name, operation, ops, prepare=None):
+    samples = []
+    started = time.perf_counter()
+    for op in range(ops):
+        if prepare:
+            prepare(op)
+        begin = time.perf_counter_ns()
+        operation(op)
+        samples.append(time.perf_counter_ns() - begin)
+    report(name, samples, time.perf_counter() - started)
+
+
+def benchmark(oe, settings_store, directory, modules, keys, ops, journal):
+    path = os.path.join(directory, f'oe_settings_{modules}x{keys}.xml')
+    populate(settings_store, path, modules, keys)
+    use_config(oe, settings_store, path, journal)
+    print(f'{modules} modules x {keys} keys, {os.path.getsize(path)} bytes')
+
+    def key(op):
+        return f'module{op % modules}', f'key{op * 7 % keys}'
+
+    def invalidate(op):
+        settings_store.invalidate(path)
+
+    measure('load_config cold', lambda op: oe.load_config(), max(1, ops // 10), invalidate)
+    measure('load_config', lambda op: oe.load_config(), ops)
+    measure('read_setting', lambda op: oe.read_setting(*key(op)), ops)
+    measure('read_settings', lambda op: oe.read_settings(key(op)[0]), ops)
+    measure('write_setting', lambda op: oe.write_setting(*key(op), str(op)), ops)
+    measure('flush_config', lambda op: oe.flush_config(), max(1, ops // 10),
+        lambda op: oe.write_setting(*key(op), f'flush{op}'))
+    measure('remove_node', lambda op: oe.remove_node(f'remove{op}'), ops,
+        lambda op: oe.write_setting(f'remove{op}', 'key', str(op)))
+    oe.flush_config()
+
+
+def stress(oe, settings_store, directory, threads, ops, journal):
+    path = os.path.join(directory, 'oe_settings_stress.xml')
+    populate(settings_store, path, 16, 16)
+    use_config(oe, settings_store, path, journal)
+    errors = []
+    latencies = {'read': [], 'write': [], 'increment': [], 'remove': []}
+    latency_lock = threading.Lock()
+
+    def worker(thread):
+        rnd = random.Random(thread)
+        local = {name: [] for name in latencies}
+        for op in range(ops):
+            begin = time.perf_counter_ns()
+            choice = rnd.random()
+            if choice < 0.5:
+                kind = 'read'
+                oe.read_setting(f'module{rnd.randrange(16)}', f'key{rnd.randrange(16)}')
+            elif choice < 0.8:
+                # every thread writes its own keys, all of them have to survive
+                kind = 'write'
+                oe.write_setting(f'thread{thread}', f'key{op}', str(op))
+            elif choice < 0.95:
+                # read-modify-write of a shared counter
+                kind = 'increment'
+                with oe.settings_transaction():
+                    value = int(oe.read_setting('stress', 'counter', '0'))
+                    oe.write_setting('stress', 'counter', str(value + 1))
+                with latency_lock:
+                    increments[0] += 1
+            else:
+                kind = 'remove'
+                oe.write_setting(f'scratch{thread}', 'key', str(op))
+                oe.remove_node(f'scratch{thread}')
+            local[kind].append(time.perf_counter_ns() - begin)
+        with latency_lock:
+            for name, samples in local.items():
+                latencies[name].extend(samples)
+
+    increments = [0]
+    workers = [threading.Thread(target=worker, args=(thread,)) for thread in range(threads)]
+    started = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    oe.flush_config()
+    elapsed = time.perf_counter() - started
+    print(f'{threads} threads x {ops} mixed ops')
+    for name, samples in latencies.items():
+        if samples:
+            report(name, samples, elapsed)
+
+    # check what actually reached the disk, not the cached document
+    settings_store.invalidate(path)
+    xml_conf = settings_store.load(path)
+    counter = int(settings_store.get_value(xml_conf, 'stress', 'counter', '0'))
+    if counter != increments[0]:
+        errors.append(f'counter is {counter}, expected {increments[0]}')
+    for thread in range(threads):
+        rnd = random.Random(thread)
+        values = settings_store.get_values(xml_conf, f'thread{thread}')
+        for op in range(ops):
+            choice = rnd.random()
+            if choice < 0.5:
+                rnd.randrange(16)
+                rnd.randrange(16)
+            elif choice < 0.8 and values.get(f'key{op}') != str(op):
+                errors.append(f'thread{thread} key{op} lost')
+        if settings_store.get_module(xml_conf, f'scratch{thread}') is not None:
+            errors.append(f'scratch{thread} not removed')
+    for error in errors[:20]:
+        print(f'  LOST UPDATE: {error}')
+    print(f'  {"FAILED" if errors else "OK"}: {increments[0]} increments, {len(errors)} errors')
+    return not errors
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--ops', type=int, default=1000, help='operations per benchmark and per stress thread')
+    parser.add_argument('--threads', type=int, default=8, help='stress threads')
+    parser.add_argument('--sizes', default='8x16,32x32,64x128', help='modules x keys of the synthetic files')
+    parser.add_argument('--journal', action='store_true', help='use the journal settings backend')
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as directory:
+        oe = import_oe(directory, args.journal)
+        import settings_store
+        for size in args.sizes.split(','):
+            modules, keys = (int(count) for count in size.split('x'))
+            benchmark(oe, settings_store, directory, modules, keys, args.ops, args.journal)
+        ok = stress(oe, settings_store, directory, args.threads, args.ops, args.journal)
+        settings_store.unwatch()
+        settings_store.flush()
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# SPDX-License-Identifier: GPL-2.0-or-later
+# Copyright (C) 2020-present Team CoreELEC (https://coreelec.org)
+
+# Compare parse and serialize time, allocated memory and RSS of the dict
+# settings document against minidom on a synthetic settings file. Runs
+# without Kodi:
+#
+#   python3 tools/benchmark_settings_document.py [modules] [keys] [rounds]
+
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from xml.dom import minidom
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'resources', 'lib'))
+
+import settings_store
+
+
+def rss_kb():
+    with open('/proc/self/status') as status:
+        for line in status:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1])
+    return 0
+
+
+def parse_minidom(data):
+    return minidom.parseString(data)
+
+
+def parse_dict(data):
+    return settings_store.parse_text([data])
+
+
+def serialize_minidom(xml_conf):
+    return xml_conf.toprettyxml(indent='\t')
+
+
+PARSERS = {
+    'minidom': (parse_minidom, serialize_minidom),
+    'dict': (parse_dict, settings_store.serialize),
+}
+
+
+def populate(modules, keys):
+    xml_conf = settings_store.new_document()
+    for module in range(modules):
+        settings_store.set_values(xml_conf, f'module{module}',
+            {f'key{key}': f'value{key}' for key in range(keys)})
+    return settings_store.serialize(xml_conf).encode()
+
+
+def timed(function, argument, rounds):
+    started = time.perf_counter()
+    for _ in range(rounds):
+        result = function(argument)
+    return (time.perf_counter() - started) / rounds * 1000, result
+
+
+def rss(name, path):
+    # RSS growth of holding one parsed document, in a fresh interpreter so
+    # the other parser's allocations do not hide it
+    output = subprocess.check_output([sys.executable, __file__, '--rss', name, path])
+    return int(output)
+
+
+def measure_rss(name, path):
+    parse, _ = PARSERS[name]
+    with open(path, 'rb') as config_file:
+        data = config_file.read()
+    before = rss_kb()
+    xml_conf = parse(data)
+    print(rss_kb() - before)
+    del xml_conf
+
+
+def main():
+    if sys.argv[1:2] == ['--rss']:
+        measure_rss(sys.argv[2], sys.argv[3])
+        return
+    modules = int(sys.argv[1]) if len(sys.argv) > 1 else 32
+    keys = int(sys.argv[2]) if len(sys.argv) > 2 else 32
+    rounds = int(sys.argv[3]) if len(sys.argv) > 3 else 20
+    data = populate(modules, keys)
+    print(f'{modules} modules x {keys} keys, {len(data)} bytes, {rounds} rounds')
+    with tempfile.NamedTemporaryFile(suffix='.xml') as config_file:
+        config_file.write(data)
+        config_file.flush()
+        for name, (parse, serialize) in PARSERS.items():
+            parse_ms, xml_conf = timed(parse, data, rounds)
+            serialize_ms, _ = timed(serialize, xml_conf, rounds)
+            del xml_conf
+            tracemalloc.start()
+            xml_conf = parse(data)
+            size, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            del xml_conf
+            print(f'{name:8} parse {parse_ms:8.2f} ms  serialize {serialize_ms:8.2f} ms  '
+                  f'document {size / 1024:8.1f} KiB  parse peak {peak / 1024:8.1f} KiB  '
+                  f'rss +{rss(name, config_file.name)} KiB')
+
+
+if __name__ == '__main__':
+    main()
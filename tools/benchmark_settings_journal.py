@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# SPDX-License-Identifier: GPL-2.0-or-later
+# Copyright (C) 2020-present Team CoreELEC (https://coreelec.org)
+
+# Compare write throughput and bytes written of the XML settings store
+# against the journal backend. Runs without Kodi:
+#
+#   python3 tools/benchmark_settings_journal.py [writes] [modules] [keys]
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'resources', 'lib'))
+
+import settings_store
+
+
+def written_bytes():
+    with open('/proc/self/io') as io:
+        for line in io:
+            if line.startswith('wchar:'):
+                return int(line.split()[1])
+    return 0
+
+
+def populate(path, modules, keys):
+    xml_conf = settings_store.new_document()
+    for module in range(modules):
+        settings_store.set_values(xml_conf, f'module{module}',
+            {f'key{key}': f'value{key}' for key in range(keys)})
+    settings_store.write(path, settings_store.serialize(xml_conf))
+
+
+def run(journal, writes, modules, keys):
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'oe_settings.xml')
+        populate(path, modules, keys)
+        settings_store.invalidate()
+        if journal:
+            settings_store.enable_journal(path)
+        before = written_bytes()
+        started = time.perf_counter()
+        for write in range(writes):
+            with settings_store.LOCK.write():
+                xml_conf = settings_store.load(path)
+                change = ('set', f'module{write % modules}', {f'key{write % keys}': str(write)})
+                settings_store.apply(xml_conf, change)
+                # delay=0: the XML path writes the file on every change like
+                # save_config() used to, the journal path only appends
+                settings_store.save(path, xml_conf, change, delay=0 if not journal else None)
+        settings_store.flush(path)
+        elapsed = time.perf_counter() - started
+        written = written_bytes() - before
+        settings_store._journals.pop(path, None)
+        settings_store.invalidate(path)
+        return writes / elapsed, written
+
+
+def main():
+    writes = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    modules = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    keys = int(sys.argv[3]) if len(sys.argv) > 3 else 16
+    print(f'{writes} writes, {modules} modules x {keys} keys')
+    for name, journal in (('xml', False), ('journal', True)):
+        throughput, written = run(journal, writes, modules, keys)
+        print(f'{name:8} {throughput:10.1f} writes/s {written:12d} bytes written {written / writes:10.1f} bytes/write')
+
+
+if __name__ == '__main__':
+    main()